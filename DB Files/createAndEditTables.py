@@ -1,6 +1,11 @@
+import os
 import sqlite3
 import sys
 
+# The shared connection manager lives in the project root, one level up.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dbConnection import get_manager
+
 # Define the name of the database file
 DB_FILE = "mydatabase.db"
 
@@ -105,115 +110,129 @@ def create_new_table():
         print("No columns defined. Aborting table creation.")
         return
 
+    # Each change is its own short transaction, taken after the prompts are
+    # answered, so other stations are never locked out while this one waits
+    # for the user.
+    db = get_manager(DB_FILE)
     try:
-        with sqlite3.connect(DB_FILE) as conn:
-            cursor = conn.cursor()
-
-            # The Failsafe for existing tables
-            if table_exists(cursor, table_name):
-                print(f"\nWarning: A table named '{table_name}' already exists.")
-                print("Choose an action:")
-                print("  1. Abort (make no changes)")
-                print("  2. Overwrite the existing table (ALL ITS DATA WILL BE LOST)")
-                print("  3. Add the newly defined columns to the existing table")
-                
-                choice = input("Enter choice (1-3): ")
-
-                if choice == '2':
-                    print(f"WARNING: This will permanently delete the table '{table_name}' and all its data.")
-                    confirm = input("Type 'OVERWRITE' to confirm: ")
-                    if confirm == 'OVERWRITE':
-                        cursor.execute(f"DROP TABLE {table_name}")
-                        print("Old table dropped.")
-                    else:
-                        print("Confirmation failed. Aborting.")
-                        return
-                elif choice == '3':
-                    # This is the "combine" option
-                    print("Adding new columns to existing table...")
-                    for col_def in new_columns:
-                        try:
-                            # We can't use '?' for column definitions, so f-string is needed.
-                            # The name was validated earlier by get_valid_name.
-                            alter_sql = f"ALTER TABLE {table_name} ADD COLUMN {col_def}"
-                            cursor.execute(alter_sql)
-                            print(f"  -> Successfully added column: {col_def}")
-                        except sqlite3.OperationalError as e:
-                            print(f"  -> Could not add column '{col_def.split()[0]}'. Reason: {e}")
-                    return # End the function here
+        overwrite = False
+
+        # The Failsafe for existing tables
+        if table_exists(db.connection().cursor(), table_name):
+            print(f"\nWarning: A table named '{table_name}' already exists.")
+            print("Choose an action:")
+            print("  1. Abort (make no changes)")
+            print("  2. Overwrite the existing table (ALL ITS DATA WILL BE LOST)")
+            print("  3. Add the newly defined columns to the existing table")
+            
+            choice = input("Enter choice (1-3): ")
+
+            if choice == '2':
+                print(f"WARNING: This will permanently delete the table '{table_name}' and all its data.")
+                confirm = input("Type 'OVERWRITE' to confirm: ")
+                if confirm == 'OVERWRITE':
+                    overwrite = True
                 else:
-                    print("Aborting table creation.")
+                    print("Confirmation failed. Aborting.")
                     return
+            elif choice == '3':
+                # This is the "combine" option
+                print("Adding new columns to existing table...")
+                for col_def in new_columns:
+                    try:
+                        # We can't use '?' for column definitions, so f-string is needed.
+                        # The name was validated earlier by get_valid_name.
+                        alter_sql = f"ALTER TABLE {table_name} ADD COLUMN {col_def}"
+                        with db.transaction() as conn:
+                            conn.execute(alter_sql)
+                        print(f"  -> Successfully added column: {col_def}")
+                    except sqlite3.OperationalError as e:
+                        print(f"  -> Could not add column '{col_def.split()[0]}'. Reason: {e}")
+                return # End the function here
+            else:
+                print("Aborting table creation.")
+                return
 
-            # Proceed with original creation if table didn't exist or user chose to overwrite
-            columns_sql = ", ".join(new_columns)
-            create_sql = f"CREATE TABLE {table_name} ({columns_sql});"
-            print("\nExecuting SQL:", create_sql)
-            cursor.execute(create_sql)
-            print(f"\nSuccess! Table '{table_name}' created.")
+        # Proceed with original creation if table didn't exist or user chose to overwrite
+        columns_sql = ", ".join(new_columns)
+        create_sql = f"CREATE TABLE {table_name} ({columns_sql});"
+        print("\nExecuting SQL:", create_sql)
+        with db.transaction() as conn: # Drop and create together, so the table is never missing
+            if overwrite:
+                conn.execute(f"DROP TABLE {table_name}")
+            conn.execute(create_sql)
+        if overwrite:
+            print("Old table dropped.")
+        print(f"\nSuccess! Table '{table_name}' created.")
 
     except sqlite3.OperationalError as e:
         print(f"\nAn SQLite error occurred: {e}")
     except Exception as e:
         print(f"\nAn unexpected error occurred: {e}")
 
+def alter_table(sql):
+    """Runs one schema change in a transaction of its own, committed at once."""
+    with get_manager(DB_FILE).transaction() as conn:
+        conn.execute(sql)
+
 def manage_existing_table():
     """Provides a menu to view and edit an existing table's schema."""
     table_name = get_valid_name("Enter the name of the table to manage: ")
     if not table_name: return
 
+    # No transaction is held while the menu waits for input; each change
+    # below commits on its own (see alter_table).
+    conn = get_manager(DB_FILE).connection()
     try:
-        with sqlite3.connect(DB_FILE) as conn:
-            cursor = conn.cursor()
-            if not table_exists(cursor, table_name):
-                print(f"Error: Table '{table_name}' not found.")
-                return
+        if not table_exists(conn.cursor(), table_name):
+            print(f"Error: Table '{table_name}' not found.")
+            return
 
-            while True:
-                view_table_schema(conn, table_name)
-                print("\n--- Manage Table Menu ---")
-                print("  1. Add a new column")
-                print("  2. Rename a column")
-                print("  3. Drop a column")
-                print("  4. Rename this table")
-                print("  5. Return to Main Menu")
-                choice = input("Enter choice: ")
-
-                if choice == '1':
-                    new_col = get_column_definitions(is_new_table=False)
-                    if new_col:
-                        try:
-                            cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN {new_col[0]}")
-                            print("Column added successfully.")
-                        except sqlite3.OperationalError as e:
-                            print(f"Error adding column: {e}")
-                elif choice == '2':
-                    old_col = get_valid_name("Enter current column name to rename: ")
-                    new_col = get_valid_name("Enter the new column name: ")
-                    try:
-                        cursor.execute(f"ALTER TABLE {table_name} RENAME COLUMN {old_col} TO {new_col}")
-                        print("Column renamed successfully.")
-                    except sqlite3.OperationalError as e:
-                        print(f"Error renaming column: {e}. Note: This requires a modern version of SQLite.")
-                elif choice == '3':
-                    col_to_drop = get_valid_name("Enter column name to drop: ")
-                    try:
-                        cursor.execute(f"ALTER TABLE {table_name} DROP COLUMN {col_to_drop}")
-                        print("Column dropped successfully.")
-                    except sqlite3.OperationalError as e:
-                        print(f"Error dropping column: {e}. Note: This requires a modern version of SQLite.")
-                elif choice == '4':
-                    new_table_name = get_valid_name("Enter the new name for this table: ")
+        while True:
+            view_table_schema(conn, table_name)
+            print("\n--- Manage Table Menu ---")
+            print("  1. Add a new column")
+            print("  2. Rename a column")
+            print("  3. Drop a column")
+            print("  4. Rename this table")
+            print("  5. Return to Main Menu")
+            choice = input("Enter choice: ")
+
+            if choice == '1':
+                new_col = get_column_definitions(is_new_table=False)
+                if new_col:
                     try:
-                        cursor.execute(f"ALTER TABLE {table_name} RENAME TO {new_table_name}")
-                        print(f"Table successfully renamed from '{table_name}' to '{new_table_name}'.")
-                        table_name = new_table_name # Update name for the loop
+                        alter_table(f"ALTER TABLE {table_name} ADD COLUMN {new_col[0]}")
+                        print("Column added successfully.")
                     except sqlite3.OperationalError as e:
-                        print(f"Error renaming table: {e}")
-                elif choice == '5':
-                    break
-                else:
-                    print("Invalid choice.")
+                        print(f"Error adding column: {e}")
+            elif choice == '2':
+                old_col = get_valid_name("Enter current column name to rename: ")
+                new_col = get_valid_name("Enter the new column name: ")
+                try:
+                    alter_table(f"ALTER TABLE {table_name} RENAME COLUMN {old_col} TO {new_col}")
+                    print("Column renamed successfully.")
+                except sqlite3.OperationalError as e:
+                    print(f"Error renaming column: {e}. Note: This requires a modern version of SQLite.")
+            elif choice == '3':
+                col_to_drop = get_valid_name("Enter column name to drop: ")
+                try:
+                    alter_table(f"ALTER TABLE {table_name} DROP COLUMN {col_to_drop}")
+                    print("Column dropped successfully.")
+                except sqlite3.OperationalError as e:
+                    print(f"Error dropping column: {e}. Note: This requires a modern version of SQLite.")
+            elif choice == '4':
+                new_table_name = get_valid_name("Enter the new name for this table: ")
+                try:
+                    alter_table(f"ALTER TABLE {table_name} RENAME TO {new_table_name}")
+                    print(f"Table successfully renamed from '{table_name}' to '{new_table_name}'.")
+                    table_name = new_table_name # Update name for the loop
+                except sqlite3.OperationalError as e:
+                    print(f"Error renaming table: {e}")
+            elif choice == '5':
+                break
+            else:
+                print("Invalid choice.")
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
 
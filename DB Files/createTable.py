@@ -1,6 +1,11 @@
+import os
 import sqlite3
 import sys
 
+# The shared connection manager lives in the project root, one level up.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dbConnection import get_manager
+
 # Define the name of the database file
 DB_FILE = "mydatabase.db"
 
@@ -93,7 +98,7 @@ def create_interactive_table():
 
     # 6. Connect and execute
     try:
-        with sqlite3.connect(DB_FILE) as conn:
+        with get_manager(DB_FILE).transaction() as conn:
             cursor = conn.cursor()
             cursor.execute(create_table_sql)
             print(f"\nSuccess! Table '{table_name}' has been created in '{DB_FILE}'.")
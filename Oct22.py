@@ -1,25 +1,46 @@
 import tkinter as tk
 from tkinter import ttk
 import threading
-import openai
 
 # --- OpenAI API Configuration ---
 # Import the key from your APIKey.py file
 try:
     from APIKey import OPENAI_API_KEY
-    # Pass the key directly to the client
-    client = openai.OpenAI(api_key=OPENAI_API_KEY)
     API_KEY_IS_SET = True
 except ImportError:
     # This will happen if the file doesn't exist
     # or the variable is not found.
     API_KEY_IS_SET = False
-except openai.OpenAIError:
-    # This might happen if the key is invalid
-    API_KEY_IS_SET = False
+
+# The openai package takes a while to import, so it is loaded in the
+# background once the window is showing (or by the first question).
+client = None
+client_lock = threading.Lock()
 # ------------------------------
 
 
+def get_client():
+    """
+    Imports openai and creates the client the first time it is needed.
+    Safe to call from any thread.
+    """
+    global client
+    with client_lock:
+        if client is None:
+            import openai
+            # Pass the key directly to the client
+            client = openai.OpenAI(api_key=OPENAI_API_KEY)
+    return client
+
+def warm_up_client():
+    """Creates the client ahead of the first question; errors are reported when a question is asked."""
+    if API_KEY_IS_SET:
+        try:
+            get_client()
+        except Exception:
+            pass
+
+
 def get_openai_response(question):
     """
     Calls the OpenAI API and returns the answer.
@@ -31,7 +52,7 @@ def get_openai_response(question):
     try:
         # Based on the documentation you provided, but adapted for Python
         # and the modern chat completions API.
-        response = client.chat.completions.create(
+        response = get_client().chat.completions.create(
             model="gpt-4o-mini",  # Using a real, available model
             messages=[
                 {"role": "system", "content": "You are a helpful assistant."},
@@ -125,5 +146,6 @@ submit_button.pack(pady=5)
 answer_box.pack(pady=10, padx=10, fill="both", expand=True) # Fill both x and y
 
 # --- Start the main event loop ---
+root.after_idle(lambda: threading.Thread(target=warm_up_client, daemon=True).start())
 root.mainloop()
 
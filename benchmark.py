@@ -0,0 +1,328 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from statistics import median
+from dbConnection import get_manager
+from customerSource import CustomerPageSource
+from customerSearch import ensure_search_index, search_filter
+from customerImport import INSERT_SQL, insert_customers
+from customerBirthdays import upcoming_birthdays
+from writeQueue import WriteQueue
+from changeLog import changes_since, last_change
+from migrations import migrate
+from sortKeys import SortKeyCache
+
+# --- Configuration ---
+# Table sizes benchmarked by default.
+SIZES = (1000, 100000, 1000000)
+# Fast operations are run this many times and the median is reported.
+REPEAT = 5
+# A result this much slower than the --compare baseline counts as a regression.
+REGRESSION_TOLERANCE = 0.25
+# ...and is also at least this many seconds slower, so timer noise on tiny timings is ignored.
+REGRESSION_MIN_SECONDS = 0.005
+# Longest any single GUI step may take before the benchmark gives up on it.
+GUI_TIMEOUT = 900
+# ---------------------
+
+FIRST_NAMES = ("Ava", "Ben", "Chloe", "Dan", "Emma", "Finn", "Grace", "Hugo", "Isla", "Jack", "Kara", "Liam")
+LAST_NAMES = ("Smith", "Jones", "Brown", "Taylor", "Wilson", "Davies", "Evans", "Thomas", "Roberts", "Walker")
+CONTACT_METHODS = ("Email", "Phone", "Mail")
+
+
+def synthetic_customers(count, seed=0, start=0):
+    """Yields `count` valid, reproducible customer rows (CUSTOMER_FIELDS order)."""
+    rng = random.Random(seed + start)
+    for i in range(start, start + count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        yield (f"{first} {last} {i}",
+               f"{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}-{rng.randint(1940, 2010)}",
+               f"{first.lower()}.{last.lower()}{i}@example.com",
+               f"{rng.randint(200, 999)}-{rng.randint(200, 999)}-{rng.randint(0, 9999):04d}",
+               f"{rng.randint(1, 9999)} Main St",
+               rng.choice(CONTACT_METHODS))
+
+def generate_database(path, rows, batch_size=50000):
+    """Creates a customer database with `rows` synthetic customers, the current schema and the search index."""
+    if os.path.exists(path):
+        os.remove(path)
+    migrate(path) # Includes the search index
+    customers = synthetic_customers(rows)
+    for start in range(0, rows, batch_size):
+        insert_customers(path, [next(customers) for _ in range(min(batch_size, rows - start))])
+    get_manager(path).execute("ANALYZE")
+
+
+class Results:
+    """Collects timings as {"name", "rows", "seconds"} records and echoes them to stderr."""
+    def __init__(self):
+        self.records = []
+
+    def add(self, name, rows, seconds):
+        self.records.append({"name": name, "rows": rows, "seconds": round(seconds, 6)})
+        print(f"{rows:>9} rows  {name:<32} {seconds * 1000:10.1f} ms", file=sys.stderr)
+
+    def time(self, name, rows, work, repeat=1):
+        """Runs `work()` `repeat` times and records the median time. Returns its last result."""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = work()
+            timings.append(time.perf_counter() - start)
+        self.add(name, rows, median(timings))
+        return result
+
+
+# --- Data-layer benchmarks (no Tk needed) ---
+def bench_data(db_path, rows, results):
+    db = get_manager(db_path)
+
+    def open_source():
+        source = CustomerPageSource(db_path)
+        source.count()
+        return source
+    source = results.time("source.open_and_count", rows, open_source, REPEAT)
+    results.time("source.first_page", rows, lambda: source.fetch_page(0), REPEAT)
+    results.time("source.last_page", rows, lambda: source.fetch_page(source.page_count() - 1), REPEAT)
+
+    def stream(sql, params=()):
+        cursor = db.execute(sql, params)
+        loaded = []
+        while True:
+            chunk = cursor.fetchmany(1000)
+            if not chunk:
+                return loaded
+            loaded.extend(chunk)
+    loaded = results.time("viewer.stream_all_rows", rows, lambda: stream(source.select_sql()))
+    results.time("viewer.sort_sql_name", rows, lambda: stream(source.select_sql("Name")))
+    results.time("viewer.sort_sql_birthday_desc", rows, lambda: stream(source.select_sql("Birthday", True)))
+    keys = SortKeyCache(loaded, source.column_types())
+    results.time("viewer.sort_memory_name_first", rows, lambda: keys.order("Name"))
+    results.time("viewer.sort_memory_name_again", rows, lambda: keys.order("Name", True), REPEAT)
+    del loaded, keys
+
+    def search():
+        where, params = search_filter("grace smith", use_fts=ensure_search_index(db_path))
+        return CustomerPageSource(db_path, where=where, params=params).count()
+    results.time("search.count_matches", rows, search, REPEAT)
+    results.time("birthdays.next_30_days", rows, lambda: upcoming_birthdays(db_path, 30), REPEAT)
+
+    new_rows = list(synthetic_customers(10000, seed=1, start=rows))
+    ids = []
+
+    def insert_one():
+        with db.transaction() as conn:
+            ids.append(conn.execute(INSERT_SQL, new_rows[len(ids)]).lastrowid)
+    results.time("insert.one", rows, insert_one, REPEAT)
+
+    def delete_one():
+        with db.transaction() as conn:
+            conn.execute("DELETE FROM Customer WHERE id = ?", (ids.pop(),))
+    results.time("delete.one", rows, delete_one, REPEAT)
+
+    # What an open viewer reads to catch up with 10 customers added elsewhere.
+    seq = last_change(db_path)
+    with db.transaction() as conn:
+        for row in new_rows[200:210]:
+            ids.append(conn.execute(INSERT_SQL, row).lastrowid)
+
+    def catch_up():
+        latest, changed = changes_since(db_path, seq)
+        return source.rows_with_keys(changed), source.read_count()
+    results.time("changes.catch_up_10", rows, catch_up, REPEAT)
+
+    # 100 single-row inserts, as separate transactions and through the group-commit queue.
+    def insert_separately():
+        for row in new_rows[:100]:
+            with db.transaction() as conn:
+                ids.append(conn.execute(INSERT_SQL, row).lastrowid)
+    results.time("insert.separate_100", rows, insert_separately)
+    writes = WriteQueue(None, db_path)
+
+    def insert_queued():
+        for row in new_rows[100:200]:
+            writes.execute(INSERT_SQL, row, on_done=ids.append)
+        writes.flush()
+    results.time("insert.queued_100", rows, insert_queued)
+    writes.close()
+
+    for customer_id in ids:
+        db.execute("DELETE FROM Customer WHERE id = ?", (customer_id,))
+    db.connection().commit()
+
+    first_new = db.query("SELECT COALESCE(MAX(id), 0) + 1 FROM Customer")[0][0]
+    results.time("insert.bulk_10k", rows, lambda: insert_customers(db_path, new_rows))
+
+    def delete_bulk():
+        with db.transaction() as conn:
+            conn.execute("DELETE FROM Customer WHERE id >= ?", (first_new,))
+    results.time("delete.bulk_10k", rows, delete_bulk)
+
+
+# --- GUI benchmarks (Tk, under a virtual display when there is no real one) ---
+def start_virtual_display():
+    """
+    Makes sure Tk has a display: keeps $DISPLAY if set, otherwise starts Xvfb.
+    Returns (process or None, reason GUI benchmarks are skipped or None).
+    """
+    if os.environ.get("DISPLAY"):
+        return None, None
+    xvfb = shutil.which("Xvfb")
+    if xvfb is None:
+        return None, "no $DISPLAY and Xvfb is not installed"
+    display = f":{100 + os.getpid() % 400}"
+    process = subprocess.Popen([xvfb, display, "-screen", "0", "1280x1024x24", "-nolisten", "tcp"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(1) # Give the server a moment to accept connections
+    if process.poll() is not None:
+        return None, "Xvfb failed to start"
+    os.environ["DISPLAY"] = display
+    return process, None
+
+def pump_until(root, condition, timeout=GUI_TIMEOUT):
+    """Runs the Tk event loop until `condition()` is true."""
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("the GUI did not finish in time")
+        root.update()
+        time.sleep(0.0005) # Let timers (after(1, ...)) come due without spinning hot
+
+def bench_startup(db_path, rows, results):
+    """
+    Times each GUI's cold start in a fresh interpreter, from launch until it
+    reports its first window (see profiling.after_first_paint()).
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, CUSTOMER_PROFILE="1")
+    for name, script in (("manager", "databaseManagement.py"), ("viewer", "readDatabase.py")):
+        start = time.perf_counter()
+        # The GUIs open customers.db in their working directory.
+        process = subprocess.Popen([sys.executable, os.path.join(here, script)], cwd=os.path.dirname(db_path),
+                                   env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        try:
+            for line in process.stderr:
+                if line.startswith("First window after"):
+                    results.add(f"startup.{name}_first_window", rows, time.perf_counter() - start)
+                    break
+            else:
+                raise RuntimeError(f"{script} exited before showing its window")
+        finally:
+            process.terminate()
+            process.wait()
+
+def bench_manager(db_path, rows, results):
+    import tkinter as tk
+    import databaseManagement
+    databaseManagement.DB_FILE = db_path
+    root = tk.Tk()
+    start = time.perf_counter()
+    app = databaseManagement.CustomerManagerApp(root)
+    # The first customer is selected once the count and its page have arrived.
+    pump_until(root, lambda: app.selected_id is not None)
+    results.add("manager.load_customers_from_db", rows, time.perf_counter() - start)
+
+    def populate():
+        app.populate_warehouse()
+        root.update_idletasks()
+    results.time("manager.populate_warehouse", rows, populate, REPEAT)
+
+    def scroll_to_middle():
+        app.scroll_warehouse("moveto", 0.5)
+        pump_until(root, lambda: all(app.customers.get_cached(index) is not None for index in app.visible_tiles))
+    results.time("manager.scroll_to_middle", rows, scroll_to_middle)
+    app.close()
+
+def bench_viewer(db_path, rows, results):
+    import readDatabase
+    readDatabase.DB_FILE = db_path
+    start = time.perf_counter()
+    app = readDatabase.CustomerViewerApp()
+    loaded = lambda: app.stream_finished and not app.pending_batches and app.insert_job is None
+    pump_until(app, lambda: app.loaded_rows > 0)
+    results.add("viewer.first_screen", rows, time.perf_counter() - start)
+    pump_until(app, loaded)
+    results.add("viewer.load_data", rows, time.perf_counter() - start)
+
+    def sort(col, reverse):
+        app.sort_column(col, reverse)
+        pump_until(app, loaded)
+        app.update_idletasks()
+    results.time("viewer.sort_column_name", rows, lambda: sort("Name", False))
+    results.time("viewer.sort_column_name_desc", rows, lambda: sort("Name", True))
+    app.close()
+
+
+def compare(records, baseline_path):
+    """Prints and returns the results that are noticeably slower than in the baseline file."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["name"], r["rows"]): r["seconds"] for r in json.load(f)["results"]}
+    regressions = []
+    for record in records:
+        before = baseline.get((record["name"], record["rows"]))
+        if (before and record["seconds"] > before * (1 + REGRESSION_TOLERANCE)
+                and record["seconds"] - before >= REGRESSION_MIN_SECONDS):
+            regressions.append(record)
+            print(f"REGRESSION {record['name']} @ {record['rows']} rows: "
+                  f"{before * 1000:.1f} ms -> {record['seconds'] * 1000:.1f} ms", file=sys.stderr)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the customer data paths on synthetic databases.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="table sizes to test")
+    parser.add_argument("--output", help="write the JSON results here (default: stdout)")
+    parser.add_argument("--workdir", help="where to build the test databases (default: a temporary folder)")
+    parser.add_argument("--no-gui", action="store_true", help="skip the Tk benchmarks")
+    parser.add_argument("--compare", help="a previous --output file; exit with 1 if anything got slower")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="customer-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    results = Results()
+    display, gui_skipped = (None, "--no-gui") if args.no_gui else start_virtual_display()
+    try:
+        for rows in args.sizes:
+            os.makedirs(os.path.join(workdir, str(rows)), exist_ok=True)
+            db_path = os.path.join(workdir, str(rows), "customers.db")
+            results.time("generate", rows, lambda: generate_database(db_path, rows))
+            bench_data(db_path, rows, results)
+            if not gui_skipped:
+                bench_startup(db_path, rows, results)
+                bench_manager(db_path, rows, results)
+                bench_viewer(db_path, rows, results)
+            get_manager(db_path).close_all()
+    finally:
+        if display:
+            display.terminate()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "gui": gui_skipped and f"skipped: {gui_skipped}" or "measured",
+        "results": results.records,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare and compare(results.records, args.compare):
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
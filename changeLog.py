@@ -0,0 +1,108 @@
+from contextlib import contextmanager
+from dbConnection import get_manager
+
+# --- Configuration ---
+# Table recording which customers changed, in commit order.
+CHANGE_TABLE = "CustomerChanges"
+# The log compacts itself, keeping about this many of the most recent changes.
+# A window that has missed more than that reloads instead of catching up.
+CHANGE_LOG_SIZE = 10000
+# Compaction runs once per this many changes, deleting a whole batch of old
+# entries in one range delete rather than one per change.
+COMPACT_EVERY = 1000
+# Columns whose changes are logged. The derived columns kept up to date by
+# migrations.py are left out, so their trigger updates are not logged twice.
+LOGGED_COLUMNS = ("Name", "Birthday", "Email", "PhoneNumber", "Address", "PreferredContact")
+# ---------------------
+
+
+def create_change_log(conn):
+    """
+    Creates the change log and the triggers that fill it, on `conn` (inside
+    the caller's transaction):
+
+    * CustomerChanges(seq, customer_id, op), where seq is an AUTOINCREMENT
+      key, so it only ever grows and is never reused after compaction, and op
+      is 'I', 'U' or 'D',
+    * INSERT, UPDATE and DELETE triggers on Customer that append to it,
+    * a trigger on the log itself that, every COMPACT_EVERY entries, drops
+      the entries older than the last CHANGE_LOG_SIZE.
+    """
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {CHANGE_TABLE} (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT, customer_id INTEGER NOT NULL, op TEXT NOT NULL
+        )
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS Customer_log_insert AFTER INSERT ON Customer BEGIN
+            INSERT INTO {CHANGE_TABLE} (customer_id, op) VALUES (new.id, 'I');
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS Customer_log_update AFTER UPDATE OF {', '.join(LOGGED_COLUMNS)} ON Customer BEGIN
+            INSERT INTO {CHANGE_TABLE} (customer_id, op) VALUES (new.id, 'U');
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS Customer_log_delete AFTER DELETE ON Customer BEGIN
+            INSERT INTO {CHANGE_TABLE} (customer_id, op) VALUES (old.id, 'D');
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {CHANGE_TABLE}_compact AFTER INSERT ON {CHANGE_TABLE}
+        WHEN new.seq % {COMPACT_EVERY} = 0 BEGIN
+            DELETE FROM {CHANGE_TABLE} WHERE seq <= new.seq - {CHANGE_LOG_SIZE};
+        END
+    """)
+
+@contextmanager
+def deferred_change_log(conn):
+    """
+    Speeds up bulk inserts into Customer on `conn`, like customerSearch's
+    deferred_search_index(): the insert trigger is paused inside the block
+    (see migrations.paused_trigger()) and the new rows are logged afterwards
+    with one INSERT ... SELECT, all in the caller's transaction.
+    """
+    from migrations import paused_trigger # migrations imports this module
+    with paused_trigger(conn, "Customer_log_insert") as paused:
+        if not paused:
+            yield # No change log on this database
+            return
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM Customer").fetchone()[0]
+        yield
+        conn.execute(f"INSERT INTO {CHANGE_TABLE} (customer_id, op) SELECT id, 'I' FROM Customer WHERE id > ? ORDER BY id",
+                     (last_id,))
+
+
+def has_change_log(db_file):
+    """Tells whether the database has the change log (schema version 7 and later)."""
+    return bool(get_manager(db_file).query("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                           (CHANGE_TABLE,)))
+
+def last_change(db_file):
+    """Returns the sequence number of the latest change (0 if nothing was ever logged)."""
+    return get_manager(db_file).query(f"SELECT COALESCE(MAX(seq), 0) FROM {CHANGE_TABLE}")[0][0]
+
+def changes_since(db_file, seq, limit=CHANGE_LOG_SIZE):
+    """
+    Returns (latest seq, ids) for the customers changed after change `seq`,
+    each id once, in the order of its latest change. The ids are None when the
+    changes since `seq` have been compacted away, or there are more than
+    `limit` of them: then reloading is quicker than catching up. The queries
+    share one read snapshot, so no change falls between them.
+    """
+    conn = get_manager(db_file).connection()
+    with conn:
+        conn.execute("BEGIN") # One read snapshot for every query
+        oldest, latest = conn.execute(f"SELECT MIN(seq), MAX(seq) FROM {CHANGE_TABLE}").fetchone()
+        if latest is None or latest <= seq:
+            return seq, []
+        if oldest > seq + 1 or latest - seq > limit:
+            return latest, None
+        rows = conn.execute(f"SELECT seq, customer_id FROM {CHANGE_TABLE} WHERE seq > ? ORDER BY seq",
+                            (seq,)).fetchall()
+    changed = {} # id -> its last seq; popping first moves a repeated id to the end
+    for change, customer_id in rows:
+        changed.pop(customer_id, None)
+        changed[customer_id] = change
+    return latest, list(changed)
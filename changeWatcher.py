@@ -0,0 +1,59 @@
+import sqlite3
+import threading
+from dbConnection import get_manager
+from tkHandoff import get_handoff
+
+# --- Configuration ---
+# How often (ms) open windows check whether the database was changed elsewhere.
+POLL_INTERVAL_MS = 1000
+# ---------------------
+
+
+class ChangeWatcher:
+    """
+    Notices when another connection commits to the database, so several
+    copies of the GUIs (and the command-line tools) sharing one file can see
+    each other's changes without anyone pressing Refresh.
+
+    A background thread polls PRAGMA data_version on its own connection.
+    SQLite changes that number whenever any other connection, in this
+    process or another, commits, and reading it touches no table, so a poll
+    costs microseconds. When it changes, `on_change()` is called on the Tk
+    thread through the window's TkHandoff, as DBWorker hands back results;
+    the thread never calls into Tk, so stop() can wait for it. Commits made
+    while a callback is pending are folded into it rather than queued.
+    """
+    def __init__(self, root, db_file, on_change, interval_ms=POLL_INTERVAL_MS):
+        self.root = root
+        self.handoff = get_handoff(root)
+        self.db = get_manager(db_file)
+        self.on_change = on_change
+        self.interval = interval_ms / 1000
+        self.stopped = threading.Event()
+        self.pending = threading.Event() # A change has been posted but not yet delivered
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        """Watcher loop: polls data_version until stop() is called."""
+        version = None
+        while not self.stopped.is_set():
+            try:
+                current = self.db.data_version()
+            except sqlite3.Error:
+                current = version # Locked or briefly unavailable; try again next time
+            if version is not None and current != version and not self.pending.is_set():
+                self.pending.set()
+                self.handoff.post(self._deliver)
+            version = current
+            self.stopped.wait(self.interval)
+
+    def _deliver(self):
+        self.pending.clear()
+        if not self.stopped.is_set():
+            self.on_change()
+
+    def stop(self):
+        """Stops watching; no further callbacks are made."""
+        self.stopped.set()
+        self.thread.join()
@@ -0,0 +1,70 @@
+import calendar
+from datetime import date, timedelta
+from dbConnection import get_manager
+from customerSource import CUSTOMER_COLUMNS
+
+# Customers with a birthday between two month-days (inclusive), soonest first.
+# BirthdayMonthDay (month * 100 + day) is kept by migrations.py and indexed,
+# so this is an index range scan.
+_RANGE_SQL = (f"SELECT {', '.join(CUSTOMER_COLUMNS)}, BirthdayMonthDay FROM Customer "
+              f"WHERE BirthdayMonthDay BETWEEN ? AND ? ORDER BY BirthdayMonthDay, Name COLLATE NOCASE")
+
+
+def date_month_day(day):
+    """Returns a date's month and day as one number, the way BirthdayMonthDay stores it (March 12 is 312)."""
+    return day.month * 100 + day.day
+
+def next_birthday(birthday_month_day, today):
+    """
+    Returns the date of the next birthday on or after `today`. In years
+    without a February 29, those birthdays fall on February 28.
+    """
+    month, day = divmod(birthday_month_day, 100)
+    for year in (today.year, today.year + 1):
+        candidate = date(year, month, min(day, calendar.monthrange(year, month)[1]))
+        if candidate >= today:
+            return candidate
+
+def _query_ranges(db_file, ranges, today, limit):
+    results = []
+    db = get_manager(db_file)
+    dates = {} # month-day -> next birthday; there are at most 366 of them
+    for start, end in ranges:
+        sql, params = _RANGE_SQL, (start, end)
+        if limit is not None:
+            sql, params = sql + " LIMIT ?", params + (limit - len(results),)
+        for row in db.query(sql, params):
+            birthday = dates.get(row[-1])
+            if birthday is None:
+                birthday = dates[row[-1]] = next_birthday(row[-1], today)
+            results.append((row[:-1], birthday))
+        if limit is not None and len(results) >= limit:
+            break
+    return results
+
+def upcoming_birthdays(db_file, days=7, today=None, limit=None):
+    """
+    Returns (customer row, next birthday) for every customer whose birthday
+    is within the next `days` days (today included), soonest first. A window
+    that runs past December 31 carries on from January 1. Raises ValueError
+    if `days` is negative.
+    """
+    if days < 0:
+        raise ValueError(f"The number of days cannot be negative: {days}")
+    today = today or date.today()
+    if days >= 365:
+        # Every birthday is within a year; start the year at today.
+        return _query_ranges(db_file, [(date_month_day(today), 1231), (101, date_month_day(today) - 1)], today, limit)
+    end = today + timedelta(days=days)
+    start_md, end_md = date_month_day(today), date_month_day(end)
+    if end.month == 2 and end.day == 28 and not calendar.isleap(end.year):
+        end_md = 229 # February 29 birthdays are celebrated on the 28th this year
+    if end.year == today.year:
+        ranges = [(start_md, end_md)]
+    else:
+        ranges = [(start_md, 1231), (101, end_md)]
+    return _query_ranges(db_file, ranges, today, limit)
+
+def birthdays_in_month(db_file, month, today=None, limit=None):
+    """Returns (customer row, next birthday) for every customer born in `month` (1-12), by day of the month."""
+    return _query_ranges(db_file, [(month * 100 + 1, month * 100 + 31)], today or date.today(), limit)
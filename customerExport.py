@@ -0,0 +1,211 @@
+import argparse
+import csv
+import gzip
+import json
+import os
+import sqlite3
+import struct
+import sys
+from array import array
+from itertools import accumulate
+from dbConnection import get_manager
+from customerSource import CustomerPageSource
+from customerSearch import ensure_search_index, search_filter
+
+# --- Configuration ---
+# Rows read per fetchmany() call, and rows per block in the columnar format.
+CHUNK_SIZE = 5000
+# gzip level for .gz files; 6 is much faster than the maximum (9) for nearly the same size.
+GZIP_LEVEL = 6
+# ---------------------
+
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".json": "jsonl", ".ndjson": "jsonl", ".cols": "cols"}
+
+# Columnar files: a magic line, a JSON header line with the column names, then
+# blocks of up to CHUNK_SIZE rows. Each block is its row count (uint32) and then
+# every column in turn: b"i" followed by the values as int64s, or b"t" followed
+# by one int32 byte length per value (-1 for NULL) and the UTF-8 text. A block
+# with zero rows ends the file. Numbers are little-endian.
+COLUMNAR_MAGIC = b"CUSTCOLS1\n"
+_COUNT = struct.Struct("<I")
+_INT64_MIN, _INT64_MAX = -2**63, 2**63 - 1
+
+
+def file_format(path):
+    """Returns "csv", "jsonl" or "cols" from a file name, ignoring a trailing .gz."""
+    name = path.lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    fmt = FORMATS.get(os.path.splitext(name)[1])
+    if fmt is None:
+        raise ValueError(f"Unsupported file type: '{path}' (use .csv, .jsonl or .cols, optionally with .gz)")
+    return fmt
+
+def open_file(path, mode="r", compressed=None):
+    """
+    Opens a file for reading or writing ("r", "w", "rb", "wb"), through gzip
+    when `compressed` is true (by default, when the name ends in .gz).
+    """
+    text = "b" not in mode
+    kwargs = {"encoding": "utf-8-sig" if "r" in mode else "utf-8", "newline": ""} if text else {}
+    if compressed is None:
+        compressed = path.lower().endswith(".gz")
+    if compressed:
+        return gzip.open(path, mode.replace("b", "") + ("t" if text else "b"), compresslevel=GZIP_LEVEL, **kwargs)
+    return open(path, mode, **kwargs)
+
+
+def _to_little_endian(values):
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tobytes()
+
+def write_columnar_block(f, rows):
+    """Writes one block of rows to a columnar file opened in binary mode."""
+    f.write(_COUNT.pack(len(rows)))
+    for column in zip(*rows):
+        if all(type(value) is int and _INT64_MIN <= value <= _INT64_MAX for value in column):
+            f.write(b"i")
+            f.write(_to_little_endian(array("q", column)))
+            continue
+        encoded = [None if value is None else str(value).encode("utf-8") for value in column]
+        f.write(b"t")
+        f.write(_to_little_endian(array("i", [-1 if value is None else len(value) for value in encoded])))
+        f.write(b"".join(value for value in encoded if value is not None))
+
+def _split_text(data, lengths):
+    """Cuts a block's UTF-8 text back into values, given each value's byte length (-1 for NULL)."""
+    text = data.decode("utf-8")
+    if len(text) == len(data) and -1 not in lengths:
+        # Plain ASCII and no NULLs (the usual case): byte lengths are character
+        # lengths, so the decoded text can be sliced directly.
+        ends = accumulate(lengths)
+        return [text[end - length:end] for length, end in zip(lengths, ends)]
+    values, start = [], 0
+    for length in lengths:
+        if length < 0:
+            values.append(None)
+        else:
+            values.append(data[start:start + length].decode("utf-8"))
+            start += length
+    return values
+
+def read_columnar(path):
+    """
+    Opens a columnar file and returns (columns, rows), where rows is an
+    iterator over row tuples that reads the file one block at a time.
+    """
+    f = open_file(path, "rb")
+    if f.readline() != COLUMNAR_MAGIC:
+        f.close()
+        raise ValueError(f"'{path}' is not a columnar customer file.")
+    columns = json.loads(f.readline())["columns"]
+
+    def read_array(typecode, count):
+        values = array(typecode)
+        values.frombytes(f.read(count * values.itemsize))
+        if sys.byteorder != "little":
+            values.byteswap()
+        return values
+
+    def rows():
+        with f:
+            while True:
+                count = _COUNT.unpack(f.read(_COUNT.size))[0]
+                if count == 0:
+                    return
+                block = []
+                for _ in columns:
+                    if f.read(1) == b"i":
+                        block.append(read_array("q", count).tolist())
+                        continue
+                    lengths = read_array("i", count).tolist()
+                    block.append(_split_text(f.read(sum(length for length in lengths if length > 0)), lengths))
+                yield from zip(*block)
+
+    return columns, rows()
+
+
+def export_query(db_file, path, sql, params=(), chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Streams the rows of a query to a CSV, JSON-lines or columnar file (gzipped
+    when the name ends in .gz) and returns how many rows were written.
+
+    Rows are read from one cursor with fetchmany(), so memory use stays the
+    same whatever the table size. The file is written under a temporary name
+    and only renamed into place once it is complete. `progress`, if given, is
+    called with the number of rows written after each chunk.
+    """
+    fmt = file_format(path)
+    cursor = get_manager(db_file).execute(sql, params)
+    columns = [description[0] for description in cursor.description]
+    partial = path + ".part"
+    written = 0
+    try:
+        with open_file(partial, "wb" if fmt == "cols" else "w", compressed=path.lower().endswith(".gz")) as f:
+            if fmt == "csv":
+                writer = csv.writer(f)
+                writer.writerow(columns)
+            elif fmt == "cols":
+                f.write(COLUMNAR_MAGIC)
+                f.write(json.dumps({"columns": columns}).encode("utf-8") + b"\n")
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                if fmt == "csv":
+                    writer.writerows(rows)
+                elif fmt == "jsonl":
+                    f.write("".join(json.dumps(dict(zip(columns, row))) + "\n" for row in rows))
+                else:
+                    write_columnar_block(f, rows)
+                written += len(rows)
+                if progress:
+                    progress(written)
+            if fmt == "cols":
+                f.write(_COUNT.pack(0))
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    finally:
+        cursor.close()
+    return written
+
+def export_customers(db_file, path, search=None, sort=None, descending=False, **kwargs):
+    """
+    Exports the Customer table, or the customers matching a search, in id
+    order or sorted by a column the same way the viewer sorts it.
+    """
+    where, params = None, ()
+    if search:
+        where, params = search_filter(search, use_fts=ensure_search_index(db_file))
+    source = CustomerPageSource(db_file, where=where, params=params)
+    if sort is not None and sort not in source.columns:
+        raise ValueError(f"Unknown column: '{sort}'")
+    return export_query(db_file, path, source.select_sql(sort, descending), source.params, **kwargs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export customers to CSV, JSON lines or the columnar format.")
+    parser.add_argument("file", help="output file: .csv, .jsonl or .cols, add .gz to compress (e.g. customers.csv.gz)")
+    parser.add_argument("--db", default="customers.db", help="database file (default: customers.db)")
+    parser.add_argument("--search", help="only export customers whose name, email or phone match this text")
+    parser.add_argument("--sort", help="column to sort by (default: id)")
+    parser.add_argument("--descending", action="store_true", help="sort in descending order")
+    args = parser.parse_args(argv)
+
+    def report(count):
+        print(f"\r{count} rows written...", end="", flush=True)
+
+    try:
+        count = export_customers(args.db, args.file, args.search, args.sort, args.descending, progress=report)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"\nExport failed: {e}")
+        return 1
+    print(f"\nExported {count} customers to {args.file}.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
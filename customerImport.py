@@ -0,0 +1,204 @@
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+from collections import namedtuple
+from contextlib import nullcontext
+from dbConnection import get_manager
+from customerValidation import CUSTOMER_FIELDS, validate_record
+from customerSearch import deferred_search_index
+from changeLog import deferred_change_log
+from customerExport import file_format, open_file, read_columnar
+from migrations import iso_birthday, month_day, paused_trigger, phone_digits
+
+# --- Configuration ---
+# Rows inserted per executemany() call; each batch is committed as one transaction.
+BATCH_SIZE = 50000
+# Other column names accepted in import files (the entry form's field names).
+FIELD_ALIASES = {"Phone": "PhoneNumber", "Preferred": "PreferredContact"}
+# ---------------------
+
+INSERT_SQL = (f"INSERT INTO Customer ({', '.join(CUSTOMER_FIELDS)}) "
+              f"VALUES ({', '.join('?' for _ in CUSTOMER_FIELDS)})")
+# The same, also filling in the normalized copies that migrations.py adds.
+INSERT_NORMALIZED_SQL = (f"INSERT INTO Customer ({', '.join(CUSTOMER_FIELDS)}, BirthdayISO, PhoneDigits, BirthdayMonthDay) "
+                         f"VALUES ({', '.join('?' for _ in CUSTOMER_FIELDS)}, ?, ?, ?)")
+NORMALIZED_COLUMNS = {"BirthdayISO", "PhoneDigits", "BirthdayMonthDay"}
+_BIRTHDAY, _PHONE = CUSTOMER_FIELDS.index("Birthday"), CUSTOMER_FIELDS.index("PhoneNumber")
+
+ImportResult = namedtuple("ImportResult", "imported rejected reject_file")
+
+
+def read_records(path):
+    """
+    Yields (line number, record) for every row of a CSV file (with a header
+    row), a JSON-lines file (one object per line) or a columnar file written
+    by customerExport.py, any of them optionally gzipped. A JSON line that
+    cannot be parsed is yielded as a string holding the parse error.
+    """
+    fmt = file_format(path)
+    if fmt == "cols":
+        columns, rows = read_columnar(path)
+        for line_number, row in enumerate(rows, 1):
+            yield line_number, dict(zip(columns, row))
+        return
+    with open_file(path) as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+            return
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, f"Not valid JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                record = "Each line must be a JSON object."
+            yield line_number, record
+
+def normalize_record(record):
+    """Maps aliased column names to Customer columns and turns every value into stripped text."""
+    clean = {}
+    for key, value in record.items():
+        if key is None:
+            continue # Extra CSV values with no header
+        key = key.strip()
+        if value is None:
+            value = ""
+        clean[FIELD_ALIASES.get(key, key)] = value.strip() if isinstance(value, str) else str(value)
+    return clean
+
+
+class RejectWriter:
+    """
+    Writes rejected rows, with their line number and the reason, to a reject
+    file in the same format as the input (CSV or JSON lines), so the file can
+    be corrected and imported again. The file is only created once a row is
+    rejected.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._file = self._writer = None
+
+    def write(self, line_number, record, reason):
+        self.count += 1
+        if self._file is None:
+            self._file = open_file(self.path, "w")
+            if file_format(self.path) == "csv":
+                self._writer = csv.writer(self._file)
+                self._writer.writerow(("line", "reason") + CUSTOMER_FIELDS)
+        if self._writer:
+            self._writer.writerow([line_number, reason] + [record.get(field, "") for field in CUSTOMER_FIELDS])
+        else:
+            self._file.write(json.dumps(dict(record, line=line_number, reason=reason)) + "\n")
+
+    def close(self):
+        if self._file:
+            self._file.close()
+
+
+def reject_path_for(path):
+    """Returns the default reject file name for an import file: name.rejects.csv or name.rejects.jsonl."""
+    root = path[:-3] if path.lower().endswith(".gz") else path
+    root = os.path.splitext(root)[0]
+    return root + (".rejects.csv" if file_format(path) == "csv" else ".rejects.jsonl")
+
+def insert_customers(db_file, rows):
+    """
+    Inserts rows of CUSTOMER_FIELDS values in one transaction with
+    executemany(). The rows are indexed for search and logged as changes
+    in one go and, on an up-to-date schema, get their normalized columns
+    filled in directly rather than by the per-row trigger.
+    """
+    manager = get_manager(db_file)
+    columns = {row[1] for row in manager.query("PRAGMA table_info(Customer)")}
+    normalizing = NORMALIZED_COLUMNS <= columns
+    with manager.transaction() as conn, deferred_search_index(conn), deferred_change_log(conn), \
+            paused_trigger(conn, "Customer_normalize_insert") if normalizing else nullcontext():
+        if normalizing:
+            conn.executemany(INSERT_NORMALIZED_SQL, [
+                row + (iso, phone_digits(row[_PHONE]), month_day(iso))
+                for row, iso in zip(rows, map(iso_birthday, (row[_BIRTHDAY] for row in rows)))])
+        else:
+            conn.executemany(INSERT_SQL, rows)
+
+def import_file(db_file, path, reject_file=None, batch_size=BATCH_SIZE, progress=None, stop=None):
+    """
+    Streams customers from a CSV, JSON-lines or columnar file into the Customer table.
+
+    Every row is checked with the entry form's rules; valid rows are inserted
+    by insert_customers() in transactions of `batch_size` rows, and the rest
+    go to the reject file with every problem found. `progress`, if given, is
+    called with the number of rows read after each batch. If the database
+    raises an error, the batches committed before it stay in the table.
+    Setting the `stop` event (a threading.Event) ends the import at the next
+    batch boundary: the batches already committed stay, the rows read since
+    are dropped, and the result counts only what was imported.
+    """
+    rejects = RejectWriter(reject_file or reject_path_for(path))
+    imported = read = 0
+    batch = []
+
+    def flush():
+        insert_customers(db_file, batch)
+        if progress:
+            progress(read)
+
+    try:
+        for line_number, record in read_records(path):
+            if stop is not None and stop.is_set():
+                batch = [] # Not committed yet; the import ends with the last whole batch
+                break
+            read += 1
+            if isinstance(record, str):
+                rejects.write(line_number, {}, record)
+                continue
+            record = normalize_record(record)
+            errors = validate_record(record)
+            if errors:
+                rejects.write(line_number, record, " ".join(errors.values()))
+                continue
+            batch.append(tuple(record[field] for field in CUSTOMER_FIELDS))
+            if len(batch) >= batch_size:
+                flush()
+                imported += len(batch)
+                batch = []
+        if batch:
+            flush()
+            imported += len(batch)
+    finally:
+        rejects.close()
+    return ImportResult(imported, rejects.count, rejects.path if rejects.count else None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import customers from a CSV, JSON-lines or columnar file.")
+    parser.add_argument("file", help="a .csv file with a header row, a .jsonl file with one object per line "
+                                     "or a .cols file from customerExport.py, optionally gzipped (.gz)")
+    parser.add_argument("--db", default="customers.db", help="database file (default: customers.db)")
+    parser.add_argument("--rejects", help="where to write rejected rows (default: <file>.rejects.csv/.jsonl)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="rows per transaction")
+    args = parser.parse_args(argv)
+
+    def report(count):
+        print(f"\r{count} rows read...", end="", flush=True)
+
+    try:
+        result = import_file(args.db, args.file, args.rejects, args.batch_size, progress=report)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"\nImport failed: {e}")
+        return 1
+    print(f"\nImported {result.imported} customers.")
+    if result.rejected:
+        print(f"Rejected {result.rejected} rows; see {result.reject_file}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+from dbConnection import get_manager
+from migrations import paused_trigger
+
+# --- Configuration ---
+# Columns covered by the search bar.
+SEARCH_COLUMNS = ("Name", "Email", "PhoneNumber")
+# Full-text index kept in sync with the Customer table by triggers.
+SEARCH_TABLE = "CustomerSearch"
+# Exists only while the schema upgrade is indexing the rows already in
+# Customer; holds the last id indexed so far.
+PROGRESS_TABLE = "CustomerSearchProgress"
+# ---------------------
+
+_fts_ready = set() # database paths whose search index ensure_search_index() found complete
+
+
+def ensure_search_index(db_file):
+    """
+    Returns True when the full-text search index is ready to use. It is built
+    by the schema upgrade (see create_search_index() and migrations.py), not
+    here, so this is only a quick look at the schema: while an upgrade is
+    still indexing, or on a database without it, searches fall back to
+    LIKE. Once found ready, the answer is remembered.
+    """
+    path = os.path.abspath(db_file)
+    if path in _fts_ready:
+        return True
+    names = {row[0] for row in get_manager(db_file).query(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN (?, ?)", (SEARCH_TABLE, PROGRESS_TABLE))}
+    if names != {SEARCH_TABLE}:
+        return False
+    _fts_ready.add(path)
+    return True
+
+def create_search_index(conn):
+    """
+    Creates the search structures that are missing, on `conn` (inside the
+    caller's transaction), and returns False if this SQLite build has no FTS5:
+
+    * case-insensitive indexes on Name, Email and PhoneNumber (shared with the
+      viewer's sort indexes), used by the LIKE fallback,
+    * an FTS5 table over the same columns that reads its text from Customer
+      (external content), with prefix indexes for search-as-you-type,
+    * INSERT/UPDATE/DELETE triggers that keep it in sync with Customer.
+
+    The existing rows are not indexed here, which on a big table would hold
+    the write lock for a long time, but by index_next_rows() a batch at a
+    time. Until it is done, a progress table records how far it has got and
+    the triggers only touch rows up to there; later rows are left to it.
+    """
+    for column in SEARCH_COLUMNS:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_Customer_{column}_sort ON Customer ({column} COLLATE NOCASE)")
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SEARCH_TABLE,)).fetchone()
+    if exists:
+        return True
+    columns = ", ".join(SEARCH_COLUMNS)
+    try:
+        conn.execute(f"""
+            CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(
+                {columns}, content='Customer', content_rowid='id', prefix='2 3'
+            )
+        """)
+    except sqlite3.OperationalError:
+        return False # This SQLite build has no FTS5; search falls back to LIKE
+    conn.execute(f"CREATE TABLE {PROGRESS_TABLE} (last_id INTEGER NOT NULL)")
+    conn.execute(f"INSERT INTO {PROGRESS_TABLE} (last_id) VALUES (0)")
+    _create_search_triggers(conn, indexed_only=True)
+    return True
+
+def _create_search_triggers(conn, indexed_only):
+    """Creates the sync triggers; with `indexed_only`, they skip rows index_next_rows() has not reached."""
+    columns = ", ".join(SEARCH_COLUMNS)
+    new_values = ", ".join(f"new.{column}" for column in SEARCH_COLUMNS)
+    old_values = ", ".join(f"old.{column}" for column in SEARCH_COLUMNS)
+    # Deleting an entry that was never indexed would corrupt an external-content FTS5 index.
+    when = (lambda row: f" WHEN {row}.id <= (SELECT last_id FROM {PROGRESS_TABLE})") if indexed_only else (lambda row: "")
+    conn.execute(f"""
+        CREATE TRIGGER Customer_search_insert AFTER INSERT ON Customer{when("new")} BEGIN
+            INSERT INTO {SEARCH_TABLE} (rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER Customer_search_delete AFTER DELETE ON Customer{when("old")} BEGIN
+            INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER Customer_search_update AFTER UPDATE OF {columns} ON Customer{when("old")} BEGIN
+            INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO {SEARCH_TABLE} (rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    """)
+
+def index_next_rows(conn, limit):
+    """
+    Indexes up to `limit` more existing rows for search, on `conn` (inside
+    the caller's transaction), and returns how many it indexed. When none
+    are left it makes the triggers cover every row, drops the progress table
+    and returns 0; it also returns 0 if there is nothing to do.
+    """
+    progress = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                            (PROGRESS_TABLE,)).fetchone()
+    if progress is None:
+        return 0 # Indexed already (or no FTS5)
+    last_id = conn.execute(f"SELECT last_id FROM {PROGRESS_TABLE}").fetchone()[0]
+    ids = conn.execute("SELECT id FROM Customer WHERE id > ? ORDER BY id LIMIT ?", (last_id, limit)).fetchall()
+    if not ids:
+        for name in ("Customer_search_insert", "Customer_search_delete", "Customer_search_update"):
+            conn.execute(f"DROP TRIGGER {name}")
+        _create_search_triggers(conn, indexed_only=False)
+        conn.execute(f"DROP TABLE {PROGRESS_TABLE}")
+        return 0
+    columns = ", ".join(SEARCH_COLUMNS)
+    conn.execute(f"INSERT INTO {SEARCH_TABLE} (rowid, {columns}) SELECT id, {columns} FROM Customer "
+                 f"WHERE id > ? AND id <= ?", (last_id, ids[-1][0]))
+    conn.execute(f"UPDATE {PROGRESS_TABLE} SET last_id = ?", (ids[-1][0],))
+    return len(ids)
+
+@contextmanager
+def deferred_search_index(conn):
+    """
+    Speeds up bulk inserts into Customer on `conn`: inside the block the
+    insert trigger is paused (see migrations.paused_trigger()), and the new
+    rows are indexed afterwards with one INSERT ... SELECT, which is several
+    times faster than the trigger firing once per row. Everything happens in
+    one transaction, so other connections never see the trigger missing; the
+    caller commits it.
+    """
+    indexing = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                            (PROGRESS_TABLE,)).fetchone()
+    if indexing:
+        yield # The upgrade still indexing existing rows will index these too
+        return
+    with paused_trigger(conn, "Customer_search_insert") as paused:
+        if not paused:
+            yield # No search index to keep up to date
+            return
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM Customer").fetchone()[0]
+        yield
+        columns = ", ".join(SEARCH_COLUMNS)
+        conn.execute(f"INSERT INTO {SEARCH_TABLE} (rowid, {columns}) SELECT id, {columns} FROM Customer WHERE id > ?",
+                     (last_id,))
+
+
+def fts_query(text):
+    """
+    Turns what the user typed into an FTS5 query: every word must match, and
+    the last token of each word is a prefix, so "jo gmail" finds jo...@gmail.com.
+    Punctuation inside a word (e.g. 817-617) is matched as a phrase.
+    """
+    words = [word for word in text.split() if any(ch.isalnum() for ch in word)]
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in words)
+
+def search_filter(text, use_fts=True):
+    """
+    Returns (where, params) limiting Customer rows to those matching `text`,
+    or (None, ()) when there is nothing to search for.
+    """
+    text = text.strip()
+    if not text:
+        return None, ()
+    if use_fts and fts_query(text):
+        return (f"id IN (SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH ?)", (fts_query(text),))
+    pattern = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    where = " OR ".join(f"{column} LIKE ? ESCAPE '\\'" for column in SEARCH_COLUMNS)
+    return where, (pattern,) * len(SEARCH_COLUMNS)
@@ -0,0 +1,365 @@
+import sqlite3
+from collections import OrderedDict
+from dbConnection import get_manager
+from customerStore import CustomerStore
+from migrations import iso_birthday_sql
+
+# --- Configuration ---
+# Column order used by the customer GUIs (matches the Customer table schema).
+CUSTOMER_COLUMNS = ("id", "Name", "Birthday", "Email", "PhoneNumber", "Address", "PreferredContact")
+# Columns whose stored text does not sort correctly as-is, mapped to an SQL
+# expression that does. Birthday is stored as MM-DD-YYYY (months and days may
+# have one digit), so sort it as the ISO date migrations.py would store in
+# BirthdayISO; values that are not real dates sort first, as they do there.
+SORT_EXPRESSIONS = {
+    "Birthday": iso_birthday_sql("Birthday"),
+}
+# Columns that migrations.py keeps a normalized copy of. When the table has the
+# copy, sorting uses it (and its index) instead.
+NORMALIZED_COLUMNS = {"Birthday": "BirthdayISO", "PhoneNumber": "PhoneDigits"}
+# Columns maintained by migrations.py, left out when showing every column.
+HIDDEN_COLUMNS = ("BirthdayISO", "PhoneDigits", "BirthdayMonthDay", "RowVersion")
+# Most keys looked up by one query in rows_with_keys() (SQLite limits bound parameters).
+KEYS_PER_QUERY = 500
+# ---------------------
+
+
+class CustomerPageSource:
+    """
+    A list-like view of a table that loads its rows in pages.
+
+    Pages are fetched with keyset pagination (WHERE id > ? ORDER BY id LIMIT ?),
+    so every fetch costs the same no matter how deep into the table it is.
+    Only the most recently used pages are kept in memory, each as a compact
+    CustomerStore, and the row count comes from a single cached COUNT(*).
+
+    `where` and `params` optionally limit the view to matching rows (for
+    example a search filter); every query the source runs honours them.
+    """
+    def __init__(self, db_file, table="Customer", columns=CUSTOMER_COLUMNS, key="id",
+                 page_size=200, max_pages=20, where=None, params=()):
+        self.db_file = db_file
+        self.db = get_manager(db_file)
+        self.table = table
+        self.where, self.params = where, tuple(params)
+        self.key = key
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self._column_types = None
+        if not columns:
+            columns = [column for column in self.column_types() if column not in HIDDEN_COLUMNS]
+        self.columns = tuple(columns)
+
+        self.pages = OrderedDict() # page number -> CustomerStore of its rows, least recently used first
+        self.page_start_keys = {0: None} # page number -> key the page starts after
+        self.positions = {} # key -> index, for every row in a cached page
+        self.generation = 0 # Bumped whenever rows shift, so stale background fetches can be dropped
+        self._count = None
+
+    def _query(self, sql, params=()):
+        """Runs one query on the shared connection and returns all of its rows."""
+        return self.db.query(sql, params)
+
+    def column_types(self):
+        """Returns the table's columns and their declared types, read from the schema once."""
+        if self._column_types is None:
+            schema = {row[1]: row[2].upper() for row in self._query(f"PRAGMA table_info({self.table})")}
+            if not schema:
+                raise sqlite3.OperationalError(f"no such table: {self.table}")
+            self._column_types = schema
+        return self._column_types
+
+    def _filtered(self, condition=None):
+        """Returns a WHERE clause joining `condition` with the source's own filter."""
+        parts = [part for part in (condition, self.where) if part]
+        return f" WHERE {' AND '.join(f'({part})' for part in parts)}" if parts else ""
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count()
+        if not 0 <= index < self.count():
+            raise IndexError("customer index out of range")
+        page_number, offset = divmod(index, self.page_size)
+        return self.get_page(page_number)[offset]
+
+    def count(self):
+        """Returns the number of rows in the table, querying it only once."""
+        if self._count is None:
+            self._count = self.read_count()
+        return self._count
+
+    def read_count(self):
+        """Counts the rows in the database now, without caching the result (safe on a worker thread)."""
+        return self._query(f"SELECT COUNT(*) FROM {self.table}{self._filtered()}", self.params)[0][0]
+
+    def cached_index_of(self, key):
+        """Returns the index of the row with this key if its page is cached, otherwise None. Never queries."""
+        return self.positions.get(key)
+
+    def index_of(self, key):
+        """
+        Returns the index of the row with this key, or None if there is no
+        such row. May query, so on the Tk thread use cached_index_of().
+        """
+        index = self.positions.get(key)
+        if index is not None:
+            return index
+        exists = self._query(f"SELECT EXISTS(SELECT 1 FROM {self.table}{self._filtered(f'{self.key} = ?')})",
+                             (key,) + self.params)
+        return self.count_before(key) if exists[0][0] else None
+
+    def count_before(self, key):
+        """Returns how many rows sort before `key`, i.e. the index it has (or would have). May query."""
+        index = self.positions.get(key)
+        if index is not None:
+            return index
+        # Not on a cached page: count the keys before it using the primary key index.
+        return self._query(f"SELECT COUNT(*) FROM {self.table}{self._filtered(f'{self.key} < ?')}",
+                           (key,) + self.params)[0][0]
+
+    def keys_between(self, low, high):
+        """Returns the keys from `low` to `high` (inclusive) in order, e.g. for selecting a range of rows."""
+        rows = self._query(f"SELECT {self.key} FROM {self.table}{self._filtered(f'{self.key} BETWEEN ? AND ?')} "
+                           f"ORDER BY {self.key}", (low, high) + self.params)
+        return [row[0] for row in rows]
+
+    def rows_after(self, key):
+        """Returns every row whose key is greater than `key` (all rows if it is None), in key order."""
+        select = f"SELECT {', '.join(self.columns)} FROM {self.table}"
+        if key is None:
+            return self._query(f"{select}{self._filtered()} ORDER BY {self.key}", self.params)
+        return self._query(f"{select}{self._filtered(f'{self.key} > ?')} ORDER BY {self.key}", (key,) + self.params)
+
+    def rows_with_keys(self, keys):
+        """
+        Returns the rows with these keys that exist and match the source's
+        filter, in key order, reading KEYS_PER_QUERY keys per query.
+        """
+        keys, rows = sorted(keys), []
+        select = f"SELECT {', '.join(self.columns)} FROM {self.table}"
+        for start in range(0, len(keys), KEYS_PER_QUERY):
+            chunk = keys[start:start + KEYS_PER_QUERY]
+            condition = f"{self.key} IN ({', '.join('?' * len(chunk))})"
+            rows += self._query(f"{select}{self._filtered(condition)} ORDER BY {self.key}", tuple(chunk) + self.params)
+        return rows
+
+    def page_count(self):
+        """Returns how many pages the table spans."""
+        return -(-self.count() // self.page_size)
+
+    def get_cached(self, index):
+        """Returns the row at `index` if its page is cached, otherwise None. Never queries."""
+        page_number, offset = divmod(index, self.page_size)
+        page = self.pages.get(page_number)
+        if page is None or offset >= len(page):
+            return None
+        self.pages.move_to_end(page_number)
+        return page[offset]
+
+    def get_page(self, page_number):
+        """Returns the rows of one page, fetching it if it is not cached."""
+        page = self.pages.get(page_number)
+        if page is not None:
+            self.pages.move_to_end(page_number)
+            return page
+        self.store_page(page_number, self.fetch_page(page_number))
+        return self.pages[page_number]
+
+    def select_sql(self, order_by=None, descending=False):
+        """
+        Returns the query that reads every row, for streaming loaders (run it with
+        self.params). Rows come in key order, or sorted by the `order_by` column
+        (ties broken by key).
+        """
+        direction = " DESC" if descending else ""
+        order = f"{self.key}{direction}"
+        if order_by is not None and order_by != self.key:
+            order = f"{self.sort_expression(order_by)}{direction}, {order}"
+        return f"SELECT {', '.join(self.columns)} FROM {self.table}{self._filtered()} ORDER BY {order}"
+
+    def sort_column(self, column):
+        """Returns the column that sorting by `column` reads: its normalized copy, if the table has one."""
+        normalized = NORMALIZED_COLUMNS.get(column)
+        return normalized if normalized in self.column_types() else column
+
+    def sort_expression(self, column):
+        """
+        Returns the SQL to sort a column by: normalized copies and numeric columns
+        sort as stored, text columns case-insensitively, and known date-like
+        columns by SORT_EXPRESSIONS.
+        """
+        target = self.sort_column(column)
+        if target != column:
+            return target
+        if column in SORT_EXPRESSIONS:
+            return SORT_EXPRESSIONS[column]
+        declared = self.column_types().get(column, "")
+        if any(name in declared for name in ("INT", "REAL", "FLOA", "DOUB", "NUM", "DEC")):
+            return column
+        return f"{column} COLLATE NOCASE"
+
+    def ensure_sort_index(self, column):
+        """Creates the index that makes sorting by `column` a plain index scan, if missing."""
+        if column == self.key:
+            return # Rows are already stored in key order
+        with self.db.transaction() as conn:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_{self.sort_column(column)}_sort "
+                         f"ON {self.table} ({self.sort_expression(column)})")
+
+    def fetch_page(self, page_number):
+        """
+        Reads one page of rows from the database without caching it, so it can run
+        on a worker thread; pass the result to store_page() on the GUI thread.
+        """
+        return self._query(*self._page_sql(self.start_key_for(page_number)))
+
+    def _page_sql(self, after_key):
+        """Returns the SQL and parameters reading the page that starts after `after_key` (None: the first)."""
+        select = f"SELECT {', '.join(self.columns)} FROM {self.table}"
+        if after_key is None:
+            return (f"{select}{self._filtered()} ORDER BY {self.key} LIMIT ?",
+                    self.params + (self.page_size,))
+        return (f"{select}{self._filtered(f'{self.key} > ?')} ORDER BY {self.key} LIMIT ?",
+                (after_key,) + self.params + (self.page_size,))
+
+    def read_pages(self, page_numbers):
+        """
+        Reads the row count and the given pages afresh, ignoring the cache, in
+        one read snapshot so they agree with each other. Safe on a worker
+        thread; pass the result to replace_pages() on the GUI thread.
+        """
+        key_column = self.columns.index(self.key)
+        pages = {}
+        conn = self.db.connection()
+        with conn:
+            conn.execute("BEGIN") # One read snapshot for every query
+            count = conn.execute(f"SELECT COUNT(*) FROM {self.table}{self._filtered()}", self.params).fetchone()[0]
+            for number in sorted(page_numbers):
+                if number * self.page_size >= count:
+                    break
+                if number == 0:
+                    after_key = None
+                elif number - 1 in pages: # Follows on from the page just read
+                    after_key = pages[number - 1][-1][key_column]
+                else:
+                    after_key = conn.execute(
+                        f"SELECT {self.key} FROM {self.table}{self._filtered()} ORDER BY {self.key} LIMIT 1 OFFSET ?",
+                        self.params + (number * self.page_size - 1,)).fetchone()[0]
+                pages[number] = conn.execute(*self._page_sql(after_key)).fetchall()
+        return count, pages
+
+    def start_key_for(self, page_number):
+        """Returns the key that a page starts after (None for the first page)."""
+        if page_number in self.page_start_keys:
+            return self.page_start_keys[page_number]
+        # Jumping ahead (e.g. dragging the scrollbar): seek the boundary key directly.
+        # This only walks the primary key index, never the rows themselves.
+        row = self._query(f"SELECT {self.key} FROM {self.table}{self._filtered()} ORDER BY {self.key} LIMIT 1 OFFSET ?",
+                          self.params + (page_number * self.page_size - 1,))
+        return row[0][0] if row else None
+
+    def store_page(self, page_number, rows):
+        """Caches a fetched page, evicting the least recently used ones."""
+        self.pages[page_number] = CustomerStore.from_rows(self.columns, rows)
+        key_column = self.columns.index(self.key)
+        first_index = page_number * self.page_size
+        for offset, row in enumerate(rows):
+            self.positions[row[key_column]] = first_index + offset
+        if len(rows) == self.page_size:
+            self.page_start_keys[page_number + 1] = rows[-1][key_column]
+        while len(self.pages) > self.max_pages:
+            self._forget_page(*self.pages.popitem(last=False))
+
+    def _forget_page(self, page_number, page):
+        """Removes an evicted page's rows from the key -> index map."""
+        for key in page.column(self.key):
+            self.positions.pop(key, None)
+
+    def append(self, row):
+        """
+        Records a newly inserted row. New AUTOINCREMENT keys are always the largest,
+        so the row belongs at the very end and only the last cached page changes.
+        """
+        if self._count is None:
+            return # Nothing counted yet; the next count() will include the row
+        page_number = self._count // self.page_size
+        page = self.pages.get(page_number)
+        if page is not None:
+            key = row[self.columns.index(self.key)]
+            page.append(row)
+            self.positions[key] = self._count
+            if len(page) == self.page_size:
+                self.page_start_keys[page_number + 1] = key
+        self._count += 1
+        self.generation += 1
+
+    def replace_row(self, row):
+        """
+        Records that a row was updated in place (same key, so no other row
+        moves). Only its cached page changes. Returns the row's index, or
+        None if its page is not cached (it is read afresh when needed).
+        """
+        index = self.positions.get(row[self.columns.index(self.key)])
+        if index is None:
+            return None
+        page_number, offset = divmod(index, self.page_size)
+        page = self.pages[page_number]
+        rows = page.rows(range(len(page)))
+        rows[offset] = tuple(row)
+        self.pages[page_number] = CustomerStore.from_rows(self.columns, rows)
+        return index
+
+    def __delitem__(self, index):
+        """
+        Records that the row at `index` was deleted. Every later row moves back one
+        slot, so the pages from that point on are dropped and re-read on demand.
+        """
+        if index < 0:
+            index += self.count()
+        if not 0 <= index < self.count():
+            raise IndexError("customer index out of range")
+        self.remove_rows(index, 1)
+
+    def remove_rows(self, index, count):
+        """
+        Records that `count` rows, the first at `index`, were deleted (the others
+        anywhere after it). Like a single delete, this drops the pages from that
+        point on, so a batch costs one invalidation rather than one per row.
+        """
+        if self._count is None:
+            return # Nothing counted yet; the next count() will leave the rows out
+        self._count = max(0, self._count - count)
+        self.invalidate_from(index // self.page_size)
+
+    def invalidate_from(self, page_number):
+        """Forgets the cached pages from `page_number` onwards (its start key stays valid)."""
+        for number in [n for n in self.pages if n >= page_number]:
+            self._forget_page(number, self.pages.pop(number))
+        for number in [n for n in self.page_start_keys if n > page_number]:
+            del self.page_start_keys[number]
+        self.generation += 1
+
+    def invalidate(self, count=None):
+        """
+        Forgets every cached page and the cached count, e.g. after another
+        station changed the table. `count`, if given, is a freshly read count
+        (see read_count()) to use instead of counting again.
+        """
+        self.pages.clear()
+        self.page_start_keys = {0: None}
+        self.positions.clear()
+        self._count = count
+        self.generation += 1
+
+    def replace_pages(self, count, pages):
+        """
+        Swaps in a fresh count and pages from read_pages(), forgetting every
+        other cached page. Unlike invalidate() alone, the pages read stay
+        cached, so the rows in view never go missing while they are re-read.
+        """
+        self.invalidate(count)
+        for number, rows in sorted(pages.items()):
+            self.store_page(number, rows)
@@ -0,0 +1,247 @@
+from array import array
+from itertools import accumulate
+
+# --- Configuration ---
+# Columns with only a handful of distinct values. Each distinct value is
+# stored once and rows keep a small code pointing at it.
+INTERNED_COLUMNS = ("PreferredContact",)
+# ---------------------
+
+
+class _IntColumn:
+    """Integers (ids) packed eight bytes apiece."""
+    def __init__(self):
+        self.data = array("q")
+
+    def extend(self, values):
+        self.data.extend(array("q", values)) # Built first, so a bad value leaves the column untouched
+
+    def get(self, index):
+        return self.data[index]
+
+    def values(self):
+        return self.data.tolist()
+
+    def nbytes(self):
+        return self.data.itemsize * len(self.data)
+
+
+class _TextColumn:
+    """
+    Strings stored end to end as UTF-8 in one bytearray, with the end offset
+    of each value in an array, instead of one Python str object per value.
+    """
+    def __init__(self):
+        self.data = bytearray()
+        self.ends = array("Q")
+        self.nulls = set() # Row numbers holding None (stored as "")
+
+    def extend(self, values):
+        try:
+            text = "".join(values)
+        except TypeError: # None or a non-text value somewhere in the batch
+            if any(value is not None and not isinstance(value, str) for value in values):
+                raise
+            for offset, value in enumerate(values):
+                if value is None:
+                    self.nulls.add(len(self.ends) + offset)
+            values = ["" if value is None else value for value in values]
+            text = "".join(values)
+        encoded = text.encode("utf-8")
+        start = len(self.data)
+        if len(encoded) == len(text): # Plain ASCII: character and byte lengths agree
+            lengths = map(len, values)
+        else:
+            lengths = [len(value.encode("utf-8")) for value in values]
+        self.data += encoded
+        ends = accumulate(lengths, initial=start)
+        next(ends) # accumulate() yields the starting offset first; only the ends are kept
+        self.ends.extend(ends)
+
+    def get(self, index):
+        if index in self.nulls:
+            return None
+        end = self.ends[index]
+        start = self.ends[index - 1] if index else 0
+        return self.data[start:end].decode("utf-8")
+
+    def values(self):
+        return [self.get(index) for index in range(len(self.ends))]
+
+    def nbytes(self):
+        return len(self.data) + self.ends.itemsize * len(self.ends)
+
+
+class _CodedColumn:
+    """A few distinct values, each stored once; rows hold a one-byte code (wider if needed)."""
+    def __init__(self):
+        self.codes = array("B")
+        self.distinct = [] # code -> value
+        self.lookup = {} # value -> code
+
+    def extend(self, values):
+        for value in set(values).difference(self.lookup):
+            self.lookup[value] = len(self.distinct)
+            self.distinct.append(value)
+        codes = list(map(self.lookup.__getitem__, values))
+        if len(self.distinct) > 2 ** (8 * self.codes.itemsize):
+            self.codes = array("L" if len(self.distinct) > 65536 else "H", self.codes)
+        self.codes.extend(codes)
+
+    def get(self, index):
+        return self.distinct[self.codes[index]]
+
+    def values(self):
+        distinct = self.distinct
+        return [distinct[code] for code in self.codes]
+
+    def nbytes(self):
+        return self.codes.itemsize * len(self.codes)
+
+
+class _ObjectColumn:
+    """Any Python values, for columns whose data fits none of the compact layouts."""
+    def __init__(self, values=()):
+        self.data = list(values)
+
+    def extend(self, values):
+        self.data.extend(values)
+
+    def get(self, index):
+        return self.data[index]
+
+    def values(self):
+        return list(self.data)
+
+    def nbytes(self):
+        return 8 * len(self.data)
+
+
+class CustomerRecord:
+    """
+    A read-only view of one row of a CustomerStore. It behaves like the row's
+    tuple (indexing, unpacking, len()) and also offers the columns by name,
+    e.g. record.Name, without copying any values out of the store.
+    """
+    __slots__ = ("_store", "_index")
+
+    def __init__(self, store, index):
+        self._store = store
+        self._index = index
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return tuple(self)[position]
+        return self._store._columns[position].get(self._index)
+
+    def __getattr__(self, name):
+        position = self._store.positions.get(name)
+        if position is None:
+            raise AttributeError(name)
+        return self._store._columns[position].get(self._index)
+
+    def __len__(self):
+        return len(self._store.columns)
+
+    def __iter__(self):
+        index = self._index
+        return (column.get(index) for column in self._store._columns)
+
+    def __eq__(self, other):
+        return tuple(self) == tuple(other) if isinstance(other, (tuple, CustomerRecord)) else NotImplemented
+
+    def __repr__(self):
+        return f"CustomerRecord{tuple(self)!r}"
+
+
+class CustomerStore:
+    """
+    Customer rows held column by column in compact form.
+
+    A list of row tuples costs a tuple plus one str object per value, several
+    hundred bytes per customer. Here integer columns are packed into arrays,
+    text columns into one UTF-8 buffer each, and INTERNED_COLUMNS into
+    one-byte codes, so a million customers take a fraction of the memory.
+    Each column's layout is chosen from the first rows added and falls back
+    to a plain list if later values do not fit it.
+
+    The store is a sequence of CustomerRecord views; row() and rows() copy
+    values out as tuples, for handing a slice to a widget.
+    """
+    def __init__(self, columns):
+        self.columns = tuple(columns)
+        self.positions = {column: position for position, column in enumerate(self.columns)}
+        self._columns = None # Chosen by the first extend()
+        self._length = 0
+
+    @classmethod
+    def from_rows(cls, columns, rows):
+        store = cls(columns)
+        store.extend(rows)
+        return store
+
+    def _choose_layouts(self, columns):
+        layouts = []
+        for name, values in zip(self.columns, columns):
+            if name in INTERNED_COLUMNS:
+                layouts.append(_CodedColumn())
+            elif values and all(type(value) is int for value in values):
+                layouts.append(_IntColumn())
+            elif all(value is None or isinstance(value, str) for value in values):
+                layouts.append(_TextColumn())
+            else:
+                layouts.append(_ObjectColumn())
+        return layouts
+
+    def extend(self, rows):
+        """Adds a batch of row tuples (in the store's column order)."""
+        if not rows:
+            return
+        columns = list(zip(*rows))
+        if self._columns is None:
+            self._columns = self._choose_layouts(columns)
+        for position, values in enumerate(columns):
+            try:
+                self._columns[position].extend(values)
+            except (TypeError, OverflowError):
+                # A value that does not fit the column's layout: keep the column as a plain list.
+                old = self._columns[position]
+                self._columns[position] = _ObjectColumn(old.values()[:self._length])
+                self._columns[position].extend(values)
+        self._length += len(rows)
+
+    def append(self, row):
+        """Adds one row tuple."""
+        self.extend([row])
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("customer index out of range")
+        return CustomerRecord(self, index)
+
+    def __iter__(self):
+        return (CustomerRecord(self, index) for index in range(self._length))
+
+    def row(self, index):
+        """Returns one row as a tuple."""
+        return tuple(column.get(index) for column in self._columns)
+
+    def rows(self, positions):
+        """Returns the rows at `positions` (any iterable of indexes, e.g. a range) as tuples."""
+        getters = [column.get for column in self._columns or ()]
+        return [tuple(get(index) for get in getters) for index in positions]
+
+    def column(self, name):
+        """Returns every value of one column as a list."""
+        if self._columns is None:
+            return []
+        return self._columns[self.positions[name]].values()
+
+    def nbytes(self):
+        """Roughly how many bytes the stored values take (not counting the interned values themselves)."""
+        return sum(column.nbytes() for column in self._columns or ())
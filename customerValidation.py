@@ -0,0 +1,80 @@
+import re
+from functools import lru_cache
+
+# --- Configuration ---
+# Customer columns a new record must provide, in insert order.
+CUSTOMER_FIELDS = ("Name", "Birthday", "Email", "PhoneNumber", "Address", "PreferredContact")
+# How each column is named in error messages (the entry form's labels).
+FIELD_LABELS = {"PhoneNumber": "Phone Number", "PreferredContact": "Preferred contact method"}
+# ---------------------
+
+# Patterns are compiled once, when the module is imported.
+EMAIL_PATTERN = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+PHONE_PATTERN = re.compile(r"[0-9]{3}-[0-9]{3}-[0-9]{4}")
+DATE_PATTERN = re.compile(r"([0-9]{1,2})-([0-9]{1,2})-([0-9]{4})") # MM-DD-YYYY
+_DAYS_IN_MONTH = (0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+@lru_cache(maxsize=65536)
+def is_valid_date(text):
+    """
+    True if `text` is a real MM-DD-YYYY date. This accepts exactly what
+    datetime.strptime(text, '%m-%d-%Y') does, but with one regex match and a
+    few integer comparisons instead of a full parse. Birthdays repeat a lot
+    in large batches, so answers are cached.
+    """
+    match = DATE_PATTERN.fullmatch(text)
+    if match is None:
+        return False
+    month, day, year = int(match[1]), int(match[2]), int(match[3])
+    if not (1 <= month <= 12 and 1 <= day <= _DAYS_IN_MONTH[month] and year >= 1):
+        return False
+    return day < 29 or month != 2 or (year % 4 == 0 and (year % 100 != 0 or year % 400 == 0))
+
+def _matches(pattern):
+    return lambda text: pattern.fullmatch(text) is not None
+
+# column -> (check, message shown when the check fails)
+FIELD_CHECKS = {
+    "Birthday": (is_valid_date, "Please use MM-DD-YYYY for the birthday."),
+    "Email": (_matches(EMAIL_PATTERN), "Please enter a valid email address."),
+    "PhoneNumber": (_matches(PHONE_PATTERN), "Please use XXX-XXX-XXXX for the phone number."),
+}
+_EMPTY_MESSAGES = {field: f"The '{FIELD_LABELS.get(field, field)}' field cannot be empty." for field in CUSTOMER_FIELDS}
+
+_email_match, _phone_match = EMAIL_PATTERN.fullmatch, PHONE_PATTERN.fullmatch
+
+def validate_record(record):
+    """
+    Checks one customer record (a dict keyed by column name) with the entry
+    form's rules. Returns {column: message} for every field with a problem,
+    or an empty dict if the record is valid.
+    """
+    # Fast path: most records are valid, so check them with no per-field loop.
+    get = record.get
+    birthday, email, phone = get("Birthday"), get("Email"), get("PhoneNumber")
+    if (birthday and email and phone and get("Name") and get("Address") and get("PreferredContact")
+            and _email_match(email) and _phone_match(phone) and is_valid_date(birthday)):
+        return {}
+    errors = {}
+    for field in CUSTOMER_FIELDS:
+        value = get(field)
+        if not value:
+            errors[field] = _EMPTY_MESSAGES[field]
+            continue
+        check = FIELD_CHECKS.get(field)
+        if check and not check[0](value):
+            errors[field] = check[1]
+    return errors
+
+def validate_batch(records):
+    """
+    Checks many records at once. Returns {position: {column: message}} for
+    the records that have problems; records that are valid are left out.
+    """
+    failures = {}
+    for position, record in enumerate(records):
+        errors = validate_record(record)
+        if errors:
+            failures[position] = errors
+    return failures
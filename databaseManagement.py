@@ -1,16 +1,35 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import sqlite3
-import re
-from datetime import datetime
 import os
+import threading
+import calendar
+from datetime import date
+from customerSource import CUSTOMER_COLUMNS, CustomerPageSource
+from dbConnection import get_manager
+from dbWorker import DBWorker
+from tkHandoff import get_handoff
+from writeQueue import WriteQueue
+from changeWatcher import ChangeWatcher
+from customerSearch import ensure_search_index, search_filter
+from customerValidation import CUSTOMER_FIELDS, validate_record
+from migrations import LATEST_VERSION, create_customer_table, migrate, schema_version
+import profiling
+# customerImport and customerBirthdays are imported where they are first
+# used, so their dependencies do not delay the first window.
 #created by Gemini
 
 DB_FILE = 'customers.db'
+SEARCH_DELAY_MS = 250 # Pause in typing before the search box runs its query
+BIRTHDAY_LIMIT = 1000 # Most customers listed at once in the birthdays window
+DELETE_CHUNK_SIZE = 500 # Ids per DELETE ... WHERE id IN (...) statement (SQLite limits bound parameters)
+CONTACT_METHODS = ("Email", "Phone", "Mail") # Choices for the preferred contact method
 
 # --- New Entry Window (Toplevel) ---
 class CustomerEntryWindow(tk.Toplevel):
     """A Toplevel window for entering a new customer's data."""
+    FORM_KEYS = {"PhoneNumber": "Phone", "PreferredContact": "Preferred"} # Column -> form field, where they differ
+
     def __init__(self, parent_app):
         super().__init__(parent_app.root)
         self.parent_app = parent_app # Reference to the main app window
@@ -45,60 +64,157 @@ class CustomerEntryWindow(tk.Toplevel):
             if widget_type == "TEntry":
                 widget = ttk.Entry(main_frame)
             else: # TCombobox
-                widget = ttk.Combobox(main_frame, values=["Email", "Phone", "Mail"], state="readonly")
+                widget = ttk.Combobox(main_frame, values=CONTACT_METHODS, state="readonly")
                 widget.set("Email")
             widget.grid(row=i, column=1, sticky=(tk.W, tk.E), pady=5, padx=5)
             self.widgets[label_text.split(" ")[0]] = widget
 
         # --- Submit Button ---
-        submit_button = ttk.Button(main_frame, text="Submit", command=self.submit_data)
-        submit_button.grid(row=len(fields), column=0, columnspan=2, pady=20)
+        self.submit_button = ttk.Button(main_frame, text="Submit", command=self.submit_data)
+        self.submit_button.grid(row=len(fields), column=0, columnspan=2, pady=20)
 
     def validate_inputs(self, data):
-        """Validates all user-entered data before submission."""
-        for key, value in data.items():
-            if not value:
-                messagebox.showerror("Validation Error", f"The '{key}' field cannot be empty.", parent=self)
-                return False
-        if not re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', data["Email"]):
-            messagebox.showerror("Validation Error", "Please enter a valid email address.", parent=self)
-            return False
-        try:
-            datetime.strptime(data["Birthday"], '%m-%d-%Y')
-        except ValueError:
-            messagebox.showerror("Validation Error", "Please use MM-DD-YYYY for the birthday.", parent=self)
-            return False
-        if not re.match(r'^\d{3}-\d{3}-\d{4}$', data["Phone"]):
-            messagebox.showerror("Validation Error", "Please use XXX-XXX-XXXX for the phone number.", parent=self)
+        """Validates all user-entered data before submission, listing every problem at once."""
+        errors = validate_record(self.as_record(data))
+        if errors:
+            messagebox.showerror("Validation Error", "\n".join(errors.values()), parent=self)
+            first_field = next(iter(errors))
+            self.widgets[self.FORM_KEYS.get(first_field, first_field)].focus_set()
             return False
         return True
 
+    def as_record(self, data):
+        """Maps the form's fields to Customer column names."""
+        return {field: data[self.FORM_KEYS.get(field, field)] for field in CUSTOMER_FIELDS}
+
     def submit_data(self):
-        """Validates data and inserts it into the database."""
+        """Validates data and queues the insert on the app's write queue."""
         data = {key: widget.get() for key, widget in self.widgets.items()}
         if not self.validate_inputs(data):
             return
 
-        try:
-            conn = sqlite3.connect(DB_FILE)
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO Customer (Name, Birthday, Email, PhoneNumber, Address, PreferredContact)
-                VALUES (?, ?, ?, ?, ?, ?);
-            """, (data["Name"], data["Birthday"], data["Email"], data["Phone"], data["Address"], data["Preferred"]))
-            conn.commit()
+        record = self.as_record(data)
+        values = tuple(record[field] for field in CUSTOMER_FIELDS)
+
+        def inserted(new_id):
             messagebox.showinfo("Success", "Customer data has been saved.", parent=self)
-            self.parent_app.refresh_customer_view() # Refresh the main view
+            self.parent_app.add_customer((new_id,) + values) # Add just the new tile
             self.destroy() # Close this entry window
-        except sqlite3.Error as e:
+
+        def failed(e):
             messagebox.showerror("Database Error", f"An error occurred: {e}", parent=self)
-        finally:
-            if conn:
-                conn.close()
+            self.submit_button.config(text="Submit", state=tk.NORMAL)
+
+        self.submit_button.config(text="Saving...", state=tk.DISABLED)
+        from customerImport import INSERT_SQL
+        self.parent_app.writes.execute(INSERT_SQL, values, on_done=inserted, on_error=failed)
+
+
+# --- Birthdays Window (Toplevel) ---
+class BirthdayWindow(tk.Toplevel):
+    """A Toplevel window listing upcoming birthdays, or the birthdays in a month."""
+    def __init__(self, parent_app):
+        super().__init__(parent_app.root)
+        self.parent_app = parent_app
+        self.query_job = None
+
+        self.title("Birthdays")
+        self.geometry("700x450")
+        self.transient(parent_app.root)
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+        main_frame = ttk.Frame(self, padding="10")
+        main_frame.pack(expand=True, fill="both")
+
+        # --- Query Controls ---
+        controls = ttk.Frame(main_frame)
+        controls.pack(fill="x")
+        ttk.Label(controls, text="Birthdays in the next").pack(side="left")
+        self.days_var = tk.StringVar(value="7")
+        ttk.Spinbox(controls, from_=0, to=365, width=5, textvariable=self.days_var).pack(side="left", padx=5)
+        ttk.Label(controls, text="days").pack(side="left")
+        ttk.Button(controls, text="Show", command=self.show_upcoming).pack(side="left", padx=(5, 20))
+        self.month_box = ttk.Combobox(controls, values=list(calendar.month_name)[1:], state="readonly", width=12)
+        self.month_box.current(date.today().month - 1)
+        self.month_box.pack(side="left")
+        ttk.Button(controls, text="Show Month", command=self.show_month).pack(side="left", padx=5)
+
+        # --- Results ---
+        columns = ("Name", "Birthday", "Next", "Email", "Phone")
+        self.tree = ttk.Treeview(main_frame, columns=columns, show="headings")
+        for col, width in zip(columns, (160, 90, 130, 180, 110)):
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=width, anchor="w")
+        self.tree.pack(expand=True, fill="both", pady=10)
+        self.tree.bind("<Double-1>", self.show_selected)
+
+        self.status_label = ttk.Label(main_frame, text="Double-click a customer to show them in the main window.")
+        self.status_label.pack(fill="x")
+
+        self.show_upcoming()
+
+    def show_upcoming(self):
+        """Lists the customers whose birthday is within the chosen number of days."""
+        try:
+            days = int(self.days_var.get())
+        except ValueError:
+            days = -1
+        if days < 0:
+            messagebox.showerror("Invalid Number", "Please enter a number of days, 0 or more.", parent=self)
+            return
+        from customerBirthdays import upcoming_birthdays
+        self.run_query(lambda: upcoming_birthdays(DB_FILE, days, limit=BIRTHDAY_LIMIT),
+                       f"in the next {days} days")
+
+    def show_month(self):
+        """Lists the customers born in the chosen month."""
+        month = self.month_box.current() + 1
+        from customerBirthdays import birthdays_in_month
+        self.run_query(lambda: birthdays_in_month(DB_FILE, month, limit=BIRTHDAY_LIMIT),
+                       f"in {calendar.month_name[month]}")
+
+    def run_query(self, query, description):
+        """Runs a birthday query on the worker thread and shows its results."""
+        if self.query_job:
+            self.query_job.cancel()
+
+        def show(results):
+            self.tree.delete(*self.tree.get_children())
+            today = date.today()
+            for row, birthday in results:
+                days_away = (birthday - today).days
+                when = "Today" if days_away == 0 else f"{birthday:%b %d} ({days_away} days)"
+                self.tree.insert("", "end", iid=row[0], values=(row[1], row[2], when, row[3], row[4]))
+            more = f" (showing the first {BIRTHDAY_LIMIT})" if len(results) >= BIRTHDAY_LIMIT else ""
+            self.status_label.config(text=f"{len(results)} birthdays {description}{more}.")
+
+        def failed(e):
+            messagebox.showerror("Database Error", f"Could not look up birthdays: {e}\n\n"
+                                 "If the database is still being upgraded, try again shortly.", parent=self)
+
+        self.status_label.config(text="Looking up birthdays...")
+        self.query_job = self.parent_app.worker.submit(query, on_done=show, on_error=failed,
+                                                       name="birthday query")
+
+    def close(self):
+        """Drops any query still running, then closes the window."""
+        if self.query_job:
+            self.query_job.cancel()
+        self.destroy()
+
+    def show_selected(self, event):
+        """Selects the double-clicked customer in the main window."""
+        item = self.tree.focus()
+        if item:
+            self.parent_app.show_customer(int(item))
 
 
 # --- Main Application Class ---
 class CustomerManagerApp:
+    TILE_HEIGHT = 70 # Height in pixels of one row of customer tiles
+    TILE_PADDING = 5
+    OVERSCAN_ROWS = 2 # Extra rows rendered above and below the viewport
+
     def __init__(self, root):
         """Initializes the main application."""
         self.root = root
@@ -106,36 +222,70 @@ class CustomerManagerApp:
         self.root.geometry("800x600")
         self.root.columnconfigure(0, weight=2); self.root.columnconfigure(1, weight=1)
         self.root.rowconfigure(0, weight=1)
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
 
-        self.customers, self.warehouse_buttons = [], []
+        self.worker = DBWorker(self.root, DB_FILE) # All customer queries run off the Tk thread
+        self.writes = WriteQueue(self.root, DB_FILE) # Inserts and deletes, committed in groups
+        self.load_job = None
+        self.pending_pages = {} # page number -> callbacks waiting for it
+        self.search_text, self.search_job = "", None
+        self.upgrade_worker, self.upgrade_stop = None, threading.Event() # Schema upgrades, see setup_database()
+        self.import_worker, self.import_stop = None, threading.Event() # File imports, see import_customers()
+
+        self.customers = []
+        self.visible_tiles, self.spare_tiles = {}, [] # grid index -> tile, recycled tiles
         self.current_selection = (0, 0)
+        self.selected_id = None # The customer shown in the details panel
+        self.selected_ids = set() # Every selected customer (Ctrl/Shift-click to select several)
+        self.anchor_id = None # Where a Shift-click range starts
+        self.range_job = None
+        self.watcher = None # Notices changes made by other stations, see start_up()
+        self.editing = None # While the details panel is being edited: the customer's id, RowVersion and values
         self.grid_columns = 5
 
         self.setup_styles()
         self.create_widgets()
-        
+        self.profiler = profiling.Profiler(self.root, self.timing_label) # F12 shows the timings overlay
+        self.bind_keys()
+
+        # The database is opened once the window is on screen, so it appears straight away.
+        profiling.after_first_paint(self.root, self.start_up)
+
+    def start_up(self):
+        """Checks the schema, starts loading customers and starts watching for other stations' changes."""
         self.setup_database()
         self.initial_load()
-        
-        self.bind_keys()
+        self.watcher = ChangeWatcher(self.root, DB_FILE, self.apply_outside_changes)
 
     def setup_database(self):
-        """Creates the database and table if they don't exist."""
+        """
+        Creates the database and table if they don't exist, then upgrades the
+        schema (see migrations.py) on its own worker thread. Upgrades rewrite
+        large tables in short batches, so loading and editing carry on meanwhile.
+        A database already at the latest version needs neither step.
+        """
         try:
-            conn = sqlite3.connect(DB_FILE)
-            cursor = conn.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS Customer (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT, Name TEXT NOT NULL, Birthday TEXT NOT NULL,
-                    Email TEXT NOT NULL, PhoneNumber TEXT, Address TEXT, PreferredContact TEXT NOT NULL
-                );
-            """)
-            conn.commit()
+            if schema_version(DB_FILE) == LATEST_VERSION:
+                return
+            create_customer_table(get_manager(DB_FILE), None, None)
         except sqlite3.Error as e:
             messagebox.showerror("Database Setup Error", f"Failed to set up database: {e}")
-        finally:
-            if conn:
-                conn.close()
+            return
+
+        def report(message): # Runs on the upgrade thread, so hand the update to the Tk thread
+            if not self.upgrade_stop.is_set(): # The window is closing
+                self.upgrade_worker.post(self.set_status, message)
+
+        def upgraded(applied):
+            if applied:
+                self.set_status(f"Database upgraded to version {schema_version(DB_FILE)}.")
+
+        def failed(e):
+            messagebox.showerror("Database Setup Error", f"Failed to upgrade database: {e}")
+
+        self.upgrade_worker = DBWorker(self.root, DB_FILE, daemon=False) # Finishes its batch after the window closes
+        self.upgrade_worker.submit(lambda: migrate(DB_FILE, report, self.upgrade_stop),
+                                   on_done=upgraded, on_error=failed, name="schema upgrade")
 
     def setup_styles(self):
         """Configures ttk styles."""
@@ -143,6 +293,7 @@ class CustomerManagerApp:
         style.configure('TLabel', font=('Helvetica', 11))
         style.configure('TEntry', font=('Helvetica', 11))
         style.configure('TButton', font=('Helvetica', 10), padding=10)
+        style.configure('Selected.TButton', font=('Helvetica', 10, 'bold'), padding=10)
         style.configure('Header.TLabel', font=('Helvetica', 14, 'bold'))
 
     def create_widgets(self):
@@ -150,7 +301,7 @@ class CustomerManagerApp:
         # --- Layout Frames ---
         warehouse_frame = ttk.Frame(self.root, padding="10")
         warehouse_frame.grid(row=0, column=0, sticky="nsew")
-        warehouse_frame.rowconfigure(1, weight=1)
+        warehouse_frame.rowconfigure(2, weight=1)
         warehouse_frame.columnconfigure(0, weight=1)
 
         details_frame = ttk.Frame(self.root, padding="20", relief="groove")
@@ -158,36 +309,84 @@ class CustomerManagerApp:
 
         # --- Warehouse Widgets ---
         ttk.Label(warehouse_frame, text="Customers in Database", style='Header.TLabel').grid(row=0, column=0)
+        search_frame = ttk.Frame(warehouse_frame)
+        search_frame.grid(row=1, column=0, sticky="ew", pady=(10, 0))
+        ttk.Label(search_frame, text="Search:").pack(side="left")
+        self.search_var = tk.StringVar()
+        ttk.Entry(search_frame, textvariable=self.search_var).pack(side="left", expand=True, fill="x", padx=(5, 0))
+        self.search_var.trace_add("write", self.schedule_search)
+
         self.canvas_frame = ttk.Frame(warehouse_frame)
-        self.canvas_frame.grid(row=1, column=0, sticky="nsew", pady=10)
+        self.canvas_frame.grid(row=2, column=0, sticky="nsew", pady=10)
+        self.canvas_frame.rowconfigure(0, weight=1)
+        self.canvas_frame.columnconfigure(0, weight=1)
+
+        # Only the tiles in view are real widgets; they are recycled while scrolling.
+        self.grid_canvas = tk.Canvas(self.canvas_frame, highlightthickness=0, yscrollincrement=self.TILE_HEIGHT)
+        grid_scrollbar = ttk.Scrollbar(self.canvas_frame, orient="vertical", command=self.scroll_warehouse)
+        self.grid_canvas.configure(yscrollcommand=grid_scrollbar.set)
+        self.grid_canvas.grid(row=0, column=0, sticky="nsew")
+        grid_scrollbar.grid(row=0, column=1, sticky="ns")
+        self.grid_canvas.bind("<Configure>", lambda event: self.render_visible_tiles(relayout_from=0))
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.grid_canvas.bind(sequence, self.handle_mouse_wheel)
 
         add_button = ttk.Button(warehouse_frame, text="Add New Customer", command=self.open_entry_window)
-        add_button.grid(row=2, column=0, pady=(10, 0), sticky="ew")
-        delete_button = ttk.Button(warehouse_frame, text="Delete Selected Customer", command=self.delete_selected_customer)
-        delete_button.grid(row=3, column=0, pady=(10, 0), sticky="ew")
+        add_button.grid(row=3, column=0, pady=(10, 0), sticky="ew")
+        delete_button = ttk.Button(warehouse_frame, text="Delete Selected Customers", command=self.delete_selected_customers)
+        delete_button.grid(row=4, column=0, pady=(10, 0), sticky="ew")
+        self.import_button = ttk.Button(warehouse_frame, text="Import Customers...", command=self.import_customers)
+        self.import_button.grid(row=5, column=0, pady=(10, 0), sticky="ew")
+        birthdays_button = ttk.Button(warehouse_frame, text="Upcoming Birthdays...", command=lambda: BirthdayWindow(self))
+        birthdays_button.grid(row=6, column=0, pady=(10, 0), sticky="ew")
 
         # --- Details Widgets ---
         self.detail_widgets = {}
         fields = ["ID", "Name", "Birthday", "Email", "Phone Number", "Address", "Preferred contact"]
+        self.detail_columns = dict(zip(fields[1:], CUSTOMER_FIELDS)) # Editable field -> Customer column
         ttk.Label(details_frame, text="Customer Details", style='Header.TLabel').pack(pady=(0, 20))
         for field in fields:
             row_frame = ttk.Frame(details_frame)
             row_frame.pack(fill="x", pady=4)
             ttk.Label(row_frame, text=f"{field}:", width=20).pack(side="left")
-            entry = ttk.Entry(row_frame, state="readonly")
+            if field == "Preferred contact":
+                entry = ttk.Combobox(row_frame, values=CONTACT_METHODS, state="disabled")
+            else:
+                entry = ttk.Entry(row_frame, state="readonly")
             entry.pack(side="left", expand=True, fill="x")
             self.detail_widgets[field] = entry
+
+        # --- Edit Controls ---
+        edit_frame = ttk.Frame(details_frame)
+        edit_frame.pack(fill="x", pady=(20, 0))
+        self.edit_button = ttk.Button(edit_frame, text="Edit Customer", command=self.begin_edit)
+        self.edit_button.pack(side="left")
+        self.save_button = ttk.Button(edit_frame, text="Save Changes", command=self.save_edit)
+        self.cancel_button = ttk.Button(edit_frame, text="Cancel", command=self.cancel_edit)
+
+        # --- Status Bar ---
+        self.status_label = ttk.Label(self.root, text="Loading customers...", anchor="w", padding=(10, 0, 10, 5))
+        self.status_label.grid(row=1, column=0, sticky="ew")
+        self.timing_label = ttk.Label(self.root, anchor="e", padding=(10, 0, 10, 5)) # Latest timings, see profiling.py
+        self.timing_label.grid(row=1, column=1, sticky="ew")
             
     def bind_keys(self):
-        """Binds arrow keys for navigation."""
-        self.root.bind("<KeyPress-Up>", self.handle_key_nav)
-        self.root.bind("<KeyPress-Down>", self.handle_key_nav)
-        self.root.bind("<KeyPress-Left>", self.handle_key_nav)
-        self.root.bind("<KeyPress-Right>", self.handle_key_nav)
+        """Binds arrow keys for navigation; with Shift held they extend the selection."""
+        for key in ("Up", "Down", "Left", "Right"):
+            self.root.bind(f"<KeyPress-{key}>", self.handle_key_nav)
+            self.root.bind(f"<Shift-KeyPress-{key}>", self.handle_key_nav)
+        self.root.bind("<Escape>", lambda event: self.cancel_edit())
+
+    def set_status(self, text):
+        """Shows a message in the status bar."""
+        self.status_label.config(text=text)
 
     def initial_load(self):
-        """Loads data and checks if the DB is empty to prompt the user."""
-        self.load_customers_from_db()
+        """Loads data in the background and checks if the DB is empty to prompt the user."""
+        self.load_customers_from_db(on_loaded=self.finish_initial_load)
+
+    def finish_initial_load(self):
+        """Shows the loaded customers, or offers to add the first one."""
         if not self.customers:
             add_first = messagebox.askyesno("Database Empty", "No customers found. Would you like to add one now?")
             if add_first:
@@ -195,112 +394,741 @@ class CustomerManagerApp:
             else:
                  self.populate_warehouse()
         else:
-            self.populate_warehouse()
-            if self.warehouse_buttons:
-                self.warehouse_buttons[0][0].focus_set()
-                self.warehouse_buttons[0][0].invoke()
-                
+            self.show_first_customer()
+
+    def show_first_customer(self):
+        """Scrolls back to the top of the grid and selects the first customer."""
+        self.grid_canvas.yview_moveto(0)
+        self.populate_warehouse()
+        self.select_customer(0)
+
     def open_entry_window(self):
         """Opens the new customer entry form."""
         CustomerEntryWindow(self)
 
-    def load_customers_from_db(self):
-        """Fetches all customer records from the database."""
-        try:
-            conn = sqlite3.connect(DB_FILE)
-            cursor = conn.cursor()
-            cursor.execute("SELECT id, Name, Birthday, Email, PhoneNumber, Address, PreferredContact FROM Customer")
-            self.customers = cursor.fetchall()
-        except sqlite3.Error as e:
+    def load_customers_from_db(self, on_loaded=None):
+        """
+        Opens a paged view of the customers matching the search box and counts
+        them on the worker thread. Rows themselves are fetched page by page as
+        tiles come into view.
+        """
+        if self.load_job:
+            self.load_job.cancel() # A newer load replaces one that is still running
+        search_text = self.search_text
+        finished = profiling.begin("load customers")
+
+        def open_source():
+            where, params = None, ()
+            if search_text:
+                where, params = search_filter(search_text, use_fts=ensure_search_index(DB_FILE))
+            source = CustomerPageSource(DB_FILE, where=where, params=params)
+            source.count()
+            return source
+
+        def loaded(source):
+            finished()
+            self.customers, self.pending_pages = source, {}
+            if search_text:
+                self.set_status(f"{len(source)} customers match '{search_text}'.")
+            else:
+                self.set_status(f"{len(source)} customers in database.")
+            if on_loaded: on_loaded()
+
+        def failed(e):
             messagebox.showerror("Database Error", f"Failed to load data: {e}")
-            self.customers = []
-        finally:
-            if conn:
-                conn.close()
+            self.customers, self.pending_pages = [], {}
+            self.set_status("Error: could not load customers.")
+            if on_loaded: on_loaded()
+
+        self.set_status("Searching..." if search_text else "Loading customers...")
+        self.load_job = self.worker.submit(open_source, on_done=loaded, on_error=failed, name="count customers")
+
+    def schedule_search(self, *args):
+        """Runs the search once typing in the search box pauses."""
+        if self.search_job:
+            self.root.after_cancel(self.search_job)
+        self.search_job = self.root.after(SEARCH_DELAY_MS, self.run_search)
 
+    def run_search(self):
+        """Shows only the customers whose name, email or phone number match the search box."""
+        self.search_job = None
+        text = self.search_var.get().strip()
+        if text == self.search_text: return
+        self.search_text = text
+        self.refresh_customer_view()
+
+    def request_page(self, page_number, then=None):
+        """Fetches a page of customers on the worker thread, then redraws the tiles showing it."""
+        waiting = self.pending_pages.get(page_number)
+        if waiting is not None:
+            if then: waiting.append(then)
+            return
+        self.pending_pages[page_number] = [then] if then else []
+        source, generation = self.customers, self.customers.generation
+
+        def page_loaded(rows):
+            if source is not self.customers: return # A reload replaced this source
+            callbacks = self.pending_pages.pop(page_number, [])
+            if source.generation != generation:
+                # Customers were added or removed while this page was in flight; fetch it again.
+                for callback in callbacks or [None]:
+                    self.request_page(page_number, callback)
+                return
+            source.store_page(page_number, rows)
+            first = page_number * source.page_size
+            self.redraw_tiles(first, first + len(rows))
+            for callback in callbacks:
+                callback()
+
+        def failed(e):
+            if source is self.customers:
+                self.pending_pages.pop(page_number, None)
+            self.set_status(f"Error: could not load customers: {e}")
+
+        self.worker.submit(lambda: source.fetch_page(page_number), on_done=page_loaded, on_error=failed,
+                           name="fetch page")
+
+    @profiling.timed("populate grid")
     def populate_warehouse(self):
-        """Creates a grid of buttons representing each customer."""
-        row, col = 0, 0
-        current_row_buttons = []
-        for customer in self.customers:
-            btn = ttk.Button(self.canvas_frame, text=f"ID: {customer[0]}\n{customer[1]}",
-                             command=lambda cust=customer: self.display_details(cust))
-            btn.grid(row=row, column=col, sticky="nsew", padx=5, pady=5)
-            self.canvas_frame.columnconfigure(col, weight=1)
-            current_row_buttons.append(btn)
-            col = (col + 1) % self.grid_columns
-            if col == 0:
-                self.warehouse_buttons.append(current_row_buttons)
-                current_row_buttons = []
-                row += 1
-        if current_row_buttons:
-            self.warehouse_buttons.append(current_row_buttons)
+        """Sizes the grid's scroll region for every customer and draws the tiles in view."""
+        self.update_scroll_region()
+        self.render_visible_tiles(relayout_from=0)
+
+    def update_scroll_region(self):
+        """Sizes the grid's scroll region to fit every customer."""
+        total_rows = -(-len(self.customers) // self.grid_columns)
+        self.grid_canvas.configure(scrollregion=(0, 0, 0, total_rows * self.TILE_HEIGHT))
+
+    @profiling.timed("render tiles")
+    def render_visible_tiles(self, relayout_from=None):
+        """
+        Binds pooled tile buttons to the customers in (and just around) the viewport.
+        Tiles already in view keep their customer unless their index is >= `relayout_from`.
+        """
+        canvas = self.grid_canvas
+        top_row = int(canvas.canvasy(0)) // self.TILE_HEIGHT
+        bottom_row = int(canvas.canvasy(canvas.winfo_height())) // self.TILE_HEIGHT
+        first = max(0, (top_row - self.OVERSCAN_ROWS) * self.grid_columns)
+        last = min(len(self.customers), (bottom_row + self.OVERSCAN_ROWS + 1) * self.grid_columns)
+
+        for index in [i for i in self.visible_tiles if not first <= i < last]:
+            tile = self.visible_tiles.pop(index)
+            canvas.itemconfigure(tile[1], state="hidden")
+            self.spare_tiles.append(tile)
+        tile_width = self.tile_width()
+        for index in range(first, last):
+            if index in self.visible_tiles and (relayout_from is None or index < relayout_from):
+                continue
+            tile = self.visible_tiles.get(index) or self.take_spare_tile()
+            self.place_tile(tile, index, tile_width)
+            self.visible_tiles[index] = tile
+
+    @profiling.timed("redraw tiles")
+    def redraw_tiles(self, first, last):
+        """Redraws the visible tiles whose index is in [first, last)."""
+        tile_width = self.tile_width()
+        for index in range(first, last):
+            tile = self.visible_tiles.get(index)
+            if tile: self.place_tile(tile, index, tile_width)
+
+    def tile_width(self):
+        """Returns the width of one grid column in pixels."""
+        return max(self.grid_canvas.winfo_width(), self.grid_columns) / self.grid_columns
+
+    def take_spare_tile(self):
+        """Returns a recycled tile, creating a new button only when the pool is empty."""
+        if self.spare_tiles:
+            return self.spare_tiles.pop()
+        tile = [ttk.Button(self.grid_canvas), None, None] # [button, canvas window id, grid index]
+        tile[0].configure(command=lambda t=tile: self.select_customer(t[2]))
+        tile[0].bind("<Control-Button-1>", lambda event, t=tile: self.handle_tile_click(self.toggle_customer, t))
+        tile[0].bind("<Shift-Button-1>", lambda event, t=tile: self.handle_tile_click(self.select_range, t))
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            tile[0].bind(sequence, self.handle_mouse_wheel)
+        tile[1] = self.grid_canvas.create_window(0, 0, window=tile[0], anchor="nw")
+        return tile
+
+    def place_tile(self, tile, index, tile_width):
+        """Moves a tile to the grid cell for `index` and shows that customer on it."""
+        button, window_id = tile[0], tile[1]
+        row, col = divmod(index, self.grid_columns)
+        tile[2] = index
+        customer = self.customers.get_cached(index)
+        if customer is None:
+            # Show a placeholder until the worker thread delivers this tile's page.
+            self.request_page(index // self.customers.page_size)
+            button.configure(text="Loading...", style='TButton')
+        else:
+            style = 'Selected.TButton' if customer[0] in self.selected_ids else 'TButton'
+            button.configure(text=f"ID: {customer[0]}\n{customer[1]}", style=style)
+        self.grid_canvas.coords(window_id, col * tile_width + self.TILE_PADDING, row * self.TILE_HEIGHT + self.TILE_PADDING)
+        self.grid_canvas.itemconfigure(window_id, state="normal", width=tile_width - 2 * self.TILE_PADDING,
+                                       height=self.TILE_HEIGHT - 2 * self.TILE_PADDING)
+
+    def scroll_warehouse(self, *args):
+        """Scrolls the customer grid and renders the tiles that came into view."""
+        self.grid_canvas.yview(*args)
+        self.render_visible_tiles()
+
+    def handle_mouse_wheel(self, event):
+        """Scrolls the customer grid one row per wheel notch."""
+        step = -1 if event.num == 4 or event.delta > 0 else 1
+        self.scroll_warehouse("scroll", step, "units")
+
+    def scroll_to_row(self, row):
+        """Scrolls the grid just enough to bring a row of tiles fully into view."""
+        canvas = self.grid_canvas
+        total_height = -(-len(self.customers) // self.grid_columns) * self.TILE_HEIGHT
+        view_top, view_height = canvas.canvasy(0), canvas.winfo_height()
+        if view_height <= 1: return # Not laid out yet; the first render starts at the top anyway
+        row_top = row * self.TILE_HEIGHT
+        if row_top < view_top:
+            canvas.yview_moveto(row_top / total_height)
+        elif row_top + self.TILE_HEIGHT > view_top + view_height:
+            canvas.yview_moveto((row_top + self.TILE_HEIGHT - view_height) / total_height)
+        else:
+            return
+        self.render_visible_tiles()
+
+    def select_customer(self, index, fetch=True):
+        """Selects only the customer at a grid index, scrolling its tile into view."""
+        customer = self.focus_customer(index, lambda: self.select_customer(index, False) if fetch else None)
+        if customer is None: return
+        self.selected_ids, self.anchor_id = {customer[0]}, customer[0]
+        self.restyle_tiles()
 
+    def focus_customer(self, index, retry):
+        """
+        Shows the customer at a grid index in the details panel and scrolls it
+        into view. Returns the customer, or None if its page is not loaded yet,
+        in which case `retry` is called once it is (if `retry` is not None).
+        """
+        if not 0 <= index < len(self.customers): return None
+        if self.editing:
+            self.set_status("Save or cancel your changes first.")
+            return None
+        customer = self.customers.get_cached(index)
+        if customer is None:
+            if retry: # Try again once its page has arrived from the worker thread
+                self.request_page(index // self.customers.page_size, then=retry)
+            return None
+        self.display_details(customer)
+        self.scroll_to_row(self.current_selection[0])
+        tile = self.visible_tiles.get(index)
+        if tile: tile[0].focus_set()
+        return customer
+
+    def handle_tile_click(self, action, tile):
+        """Runs a Ctrl- or Shift-click on a tile instead of the tile's plain click."""
+        action(tile[2])
+        return "break"
+
+    def toggle_customer(self, index):
+        """Adds the customer at a grid index to the selection, or removes it (Ctrl-click)."""
+        customer = self.focus_customer(index, None)
+        if customer is None: return
+        self.selected_ids ^= {customer[0]}
+        self.anchor_id = customer[0]
+        self.restyle_tiles()
+        self.show_selection_count()
+
+    def select_range(self, index, fetch=True):
+        """
+        Selects every customer from the anchor (the last plainly clicked or
+        Ctrl-clicked customer) to the one at a grid index (Shift-click). The
+        grid is in id order, so the range is every matching id between the
+        two; those are looked up on the worker thread, off-screen rows included.
+        """
+        if self.anchor_id is None:
+            self.select_customer(index)
+            return
+        customer = self.focus_customer(index, lambda: self.select_range(index, False) if fetch else None)
+        if customer is None: return
+        low, high = sorted((self.anchor_id, customer[0]))
+        self.selected_ids = {low, high}
+        self.restyle_tiles()
+        if self.range_job:
+            self.range_job.cancel()
+        source = self.customers
+
+        def selected(ids):
+            if source is not self.customers: return # The view was reloaded meanwhile
+            self.selected_ids = set(ids)
+            self.restyle_tiles()
+            self.show_selection_count()
+
+        self.range_job = self.worker.submit(lambda: source.keys_between(low, high), on_done=selected,
+                                            on_error=lambda e: self.set_status(f"Error: could not select: {e}"),
+                                            name="select range")
+
+    def restyle_tiles(self):
+        """Highlights the visible tiles of selected customers."""
+        for index, tile in self.visible_tiles.items():
+            customer = self.customers.get_cached(index)
+            selected = customer is not None and customer[0] in self.selected_ids
+            tile[0].configure(style='Selected.TButton' if selected else 'TButton')
+
+    def show_selection_count(self):
+        """Shows how many customers are selected, when it is more than one."""
+        if len(self.selected_ids) > 1:
+            self.set_status(f"{len(self.selected_ids)} customers selected.")
+
+    def show_customer(self, customer_id):
+        """Selects a customer by id, if the current search shows them."""
+        self.locate_customer(customer_id, self.select_customer,
+                             lambda: self.set_status("That customer is hidden by the current search."))
+
+    def locate_customer(self, customer_id, on_found, on_missing=None):
+        """
+        Finds a customer's grid index and calls `on_found(index)`, or
+        `on_missing()` if the current view does not have them. A customer on a
+        cached page is found at once; otherwise the lookup (a COUNT that may
+        scan the search results) runs on the worker thread.
+        """
+        source = self.customers
+        if not isinstance(source, CustomerPageSource):
+            return # Still loading, or the last load failed
+        index = source.cached_index_of(customer_id)
+        if index is not None:
+            on_found(index)
+            return
+        generation = source.generation
+
+        def located(index):
+            if source is not self.customers: return # A reload replaced this source
+            if source.generation != generation:
+                self.locate_customer(customer_id, on_found, on_missing) # Rows moved meanwhile; look again
+            elif index is not None:
+                on_found(index)
+            elif on_missing:
+                on_missing()
+
+        self.worker.submit(lambda: source.index_of(customer_id), on_done=located,
+                           on_error=lambda e: self.set_status(f"Error: could not find the customer: {e}"),
+                           name="locate customer")
+
+    def selected_index(self):
+        """
+        Returns the grid index of the selected customer if their page is
+        cached, or None (also if nothing is selected). Never queries; see
+        locate_customer() for customers further away.
+        """
+        if self.selected_id is None or not isinstance(self.customers, CustomerPageSource): return None
+        return self.customers.cached_index_of(self.selected_id) # id -> index map, no widget lookups
+
+    def forget_customer(self, customer_id):
+        """Drops a customer who is gone from the selection and, if shown, from the details panel."""
+        self.selected_ids.discard(customer_id)
+        if self.anchor_id == customer_id:
+            self.anchor_id = None
+        if self.selected_id == customer_id:
+            self.selected_id = None
+            self.clear_details()
+        self.restyle_tiles()
+
+    def clear_details(self):
+        """Empties the details panel."""
+        for widget in self.detail_widgets.values():
+            self.fill_detail(widget, "")
+
+    @staticmethod
+    def fill_detail(widget, value):
+        """Sets the text of a details field, whether or not it is currently editable."""
+        state = str(widget.cget("state"))
+        widget.config(state="normal")
+        widget.delete(0, tk.END)
+        widget.insert(0, "" if value is None else value)
+        widget.config(state=state)
+
+    @profiling.timed("show details")
     def display_details(self, customer_data):
-        """Updates the read-only fields with selected customer's data."""
+        """
+        Updates the read-only fields with selected customer's data and records
+        the selection. A customer no longer in the list (deleted at another
+        station meanwhile) is deselected again once that is known.
+        """
         (cust_id, name, bday, email, phone, addr, preferred) = customer_data
+        self.selected_id = cust_id
         details = {"ID": cust_id, "Name": name, "Birthday": bday, "Email": email,
                    "Phone Number": phone, "Address": addr, "Preferred contact": preferred}
         for field, widget in self.detail_widgets.items():
-            widget.config(state="normal")
-            widget.delete(0, tk.END)
-            widget.insert(0, details.get(field, ""))
-            widget.config(state="readonly")
-        for r, row_buttons in enumerate(self.warehouse_buttons):
-            for c, button in enumerate(row_buttons):
-                if button.cget('text').startswith(f"ID: {cust_id}"):
-                    self.current_selection = (r, c)
-                    return
+            self.fill_detail(widget, details.get(field, ""))
+
+        def located(index):
+            if self.selected_id == cust_id:
+                self.current_selection = divmod(index, self.grid_columns)
+
+        def missing():
+            if self.selected_id == cust_id:
+                self.forget_customer(cust_id)
+                self.set_status("That customer has been deleted at another station.")
+        self.locate_customer(cust_id, located, missing)
+
+    def set_details_editable(self, editable):
+        """Switches the details panel between showing a customer and editing them."""
+        for field, widget in self.detail_widgets.items():
+            if field == "ID":
+                continue
+            if isinstance(widget, ttk.Combobox):
+                widget.config(state="readonly" if editable else "disabled")
+            else:
+                widget.config(state="normal" if editable else "readonly")
+        if editable:
+            self.edit_button.pack_forget()
+            self.save_button.config(state=tk.NORMAL)
+            self.save_button.pack(side="left")
+            self.cancel_button.pack(side="left", padx=(10, 0))
+            self.detail_widgets["Name"].focus_set()
+        else:
+            self.save_button.pack_forget()
+            self.cancel_button.pack_forget()
+            self.edit_button.pack(side="left")
+
+    def begin_edit(self):
+        """
+        Makes the details panel editable. The customer is read afresh first,
+        with their RowVersion, so the edit starts from the saved values and
+        can later be checked against changes saved elsewhere meanwhile.
+        """
+        if self.editing or self.selected_id is None:
+            return
+        customer_id = self.selected_id
+        sql = f"SELECT {', '.join(CUSTOMER_COLUMNS)}, RowVersion FROM Customer WHERE id = ?"
+
+        def loaded(rows):
+            if self.editing or self.selected_id != customer_id:
+                return # The selection moved on while the row was read
+            if not rows:
+                self.forget_customer(customer_id)
+                self.set_status("That customer has been deleted at another station.")
+                return
+            customer, version = rows[0][:-1], rows[0][-1]
+            self.update_customer(customer) # Show the current values, should they have changed
+            self.editing = {"id": customer_id, "version": version,
+                            "values": dict(zip(CUSTOMER_FIELDS, customer[1:]))}
+            self.set_details_editable(True)
+            self.set_status(f"Editing '{customer[1]}'. Press Escape to cancel.")
+
+        def failed(e):
+            if isinstance(e, sqlite3.OperationalError) and "RowVersion" in str(e):
+                # An upgrade in progress has not added the column yet
+                self.set_status("Editing is available once the database upgrade has added RowVersion.")
+                return
+            messagebox.showerror("Database Error", f"Could not start editing: {e}")
+
+        self.worker.submit(lambda: get_manager(DB_FILE).query(sql, (customer_id,)), on_done=loaded, on_error=failed,
+                           name="read customer")
+
+    def save_edit(self):
+        """
+        Validates the edited details and saves them with one UPDATE of just
+        the changed columns. The UPDATE only matches if the customer's
+        RowVersion is still the one read when editing began, so a change
+        saved at another station meanwhile is never silently overwritten.
+        """
+        if not self.editing:
+            return
+        record = {column: self.detail_widgets[field].get() for field, column in self.detail_columns.items()}
+        errors = validate_record(record)
+        if errors:
+            messagebox.showerror("Validation Error", "\n".join(errors.values()))
+            first_column = next(iter(errors))
+            field = next(field for field, column in self.detail_columns.items() if column == first_column)
+            self.detail_widgets[field].focus_set()
+            return
+        editing = self.editing
+        changed = {column: value for column, value in record.items() if value != editing["values"][column]}
+        if not changed:
+            self.end_edit()
+            return
+        customer = (editing["id"],) + tuple(record[column] for column in CUSTOMER_FIELDS)
+        assignments = ", ".join(f"{column} = ?" for column in changed)
+        sql = f"UPDATE Customer SET {assignments}, RowVersion = RowVersion + 1 WHERE id = ? AND RowVersion = ?"
+        params = tuple(changed.values()) + (editing["id"], editing["version"])
+
+        def saved(updated):
+            self.end_edit()
+            if updated:
+                self.update_customer(customer)
+                self.set_status(f"Saved changes to '{customer[1]}'.")
+                return
+            messagebox.showwarning(
+                "Edit Conflict",
+                "This customer was changed or deleted at another station after you started editing, "
+                "so your changes were not saved. The details now show what is saved; edit them again if need be.")
+            self.reload_customer(editing["id"])
+
+        def failed(e):
+            self.save_button.config(state=tk.NORMAL)
+            messagebox.showerror("Database Error", f"Failed to save changes: {e}")
+
+        self.save_button.config(state=tk.DISABLED)
+        self.writes.submit(lambda conn: conn.execute(sql, params).rowcount == 1, on_done=saved, on_error=failed)
+
+    def cancel_edit(self):
+        """Leaves edit mode, putting back the values the edit started from."""
+        if not self.editing:
+            return
+        editing = self.editing
+        self.end_edit()
+        if self.selected_id == editing["id"]:
+            self.display_details((editing["id"],) + tuple(editing["values"][column] for column in CUSTOMER_FIELDS))
+        self.set_status("Edit cancelled.")
+
+    def end_edit(self):
+        """Makes the details panel read-only again."""
+        self.editing = None
+        self.set_details_editable(False)
+
+    def update_customer(self, customer):
+        """Shows a customer's new values: redraws only their tile and, if selected, the details panel."""
+        index = self.customers.replace_row(customer)
+        if index is not None:
+            self.redraw_tiles(index, index + 1)
+        if self.selected_id == customer[0]:
+            self.display_details(customer)
+
+    def reload_customer(self, customer_id):
+        """Reads one customer again on the worker thread and shows their saved values."""
+        sql = f"SELECT {', '.join(CUSTOMER_COLUMNS)} FROM Customer WHERE id = ?"
+
+        def loaded(rows):
+            if rows:
+                self.update_customer(rows[0])
+            else:
+                self.forget_customer(customer_id)
+                self.set_status("That customer has been deleted at another station.")
+
+        self.worker.submit(lambda: get_manager(DB_FILE).query(sql, (customer_id,)), on_done=loaded,
+                           on_error=lambda e: self.set_status(f"Error: could not reload the customer: {e}"),
+                           name="read customer")
 
     def handle_key_nav(self, event):
-        """Handles arrow key navigation."""
-        if not self.warehouse_buttons: return
-        row, col = self.current_selection
+        """Handles arrow key navigation across the whole customer list."""
+        if isinstance(event.widget, (tk.Entry, ttk.Entry)): return # Moving the cursor in a text field
+        if not self.customers or self.editing: return
+        last_row = (len(self.customers) - 1) // self.grid_columns
+        index = self.selected_index()
+        # Off the cached pages, the position recorded when they were shown will do
+        row, col = divmod(index, self.grid_columns) if index is not None else self.current_selection
         if event.keysym == "Up": row = max(0, row - 1)
-        elif event.keysym == "Down": row = min(len(self.warehouse_buttons) - 1, row + 1)
+        elif event.keysym == "Down": row = min(last_row, row + 1)
         elif event.keysym == "Left": col = max(0, col - 1)
-        elif event.keysym == "Right": col = min(len(self.warehouse_buttons[row]) - 1, col + 1)
-        if col >= len(self.warehouse_buttons[row]): col = len(self.warehouse_buttons[row]) - 1
-        self.current_selection = (row, col)
-        new_button = self.warehouse_buttons[row][col]
-        new_button.focus_set()
-        new_button.invoke()
-
-    def delete_selected_customer(self):
-        """Deletes the currently selected customer after confirmation."""
-        if not self.customers or not self.warehouse_buttons: return
-        row, col = self.current_selection
-        index = row * self.grid_columns + col
-        if index >= len(self.customers): return
-            
-        customer_id, customer_name = self.customers[index][0], self.customers[index][1]
-        confirm = messagebox.askyesno("Confirm Delete", f"Permanently delete '{customer_name}' (ID: {customer_id})?")
-        if confirm:
-            try:
-                conn = sqlite3.connect(DB_FILE)
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM Customer WHERE id = ?", (customer_id,))
-                conn.commit()
-                messagebox.showinfo("Success", f"Customer '{customer_name}' has been deleted.")
-                self.refresh_customer_view()
-            except sqlite3.Error as e:
-                messagebox.showerror("Database Error", f"Failed to delete customer: {e}")
-            finally:
-                if conn:
-                    conn.close()
+        elif event.keysym == "Right": col = min(self.grid_columns - 1, col + 1)
+        target = min(row * self.grid_columns + col, len(self.customers) - 1)
+        if event.state & 0x0001: # Shift extends the selection from the anchor
+            self.select_range(target)
+        else:
+            self.select_customer(target)
+
+    def delete_selected_customers(self):
+        """
+        Deletes every selected customer after confirmation. The ids go to the
+        write queue as DELETE ... WHERE id IN (...) statements of up to
+        DELETE_CHUNK_SIZE ids, all in one transaction, and the grid is then
+        updated once for the whole batch.
+        """
+        if self.editing:
+            self.set_status("Save or cancel your changes first.")
+            return
+        ids = sorted(self.selected_ids)
+        if not ids:
+            if self.selected_id is None: return
+            ids = [self.selected_id]
+        if len(ids) == 1:
+            index = self.customers.cached_index_of(ids[0])
+            customer = self.customers.get_cached(index) if index is not None else None
+            if customer is not None:
+                question = f"Permanently delete '{customer[1]}' (ID: {ids[0]})?"
+            else: # Not on a cached page; asking the database for the name is not worth a wait
+                question = f"Permanently delete customer ID {ids[0]}?"
+        else:
+            question = f"Permanently delete {len(ids)} selected customers?"
+        if not messagebox.askyesno("Confirm Delete", question):
+            return
+
+        def delete(conn):
+            deleted = 0
+            for start in range(0, len(ids), DELETE_CHUNK_SIZE):
+                chunk = ids[start:start + DELETE_CHUNK_SIZE]
+                marks = ", ".join("?" * len(chunk))
+                deleted += conn.execute(f"DELETE FROM Customer WHERE id IN ({marks})", chunk).rowcount
+            return deleted
+
+        def deleted(count):
+            self.set_status(f"Deleted {count} customer{'s' if count != 1 else ''}.")
+            if count:
+                self.remove_customers(ids[0], count)
+
+        def failed(e):
+            messagebox.showerror("Database Error", f"Failed to delete customers: {e}")
+
+        self.writes.submit(delete, on_done=deleted, on_error=failed)
+
+    def import_customers(self):
+        """
+        Imports customers from a CSV, JSON-lines or columnar file on a worker
+        thread of its own, so browsing and searching carry on during a long
+        import instead of queueing behind it. Closing the window stops the
+        import after the batch in progress.
+        """
+        path = filedialog.askopenfilename(
+            title="Import Customers",
+            filetypes=[("Customer files", "*.csv *.jsonl *.json *.cols *.gz"), ("All files", "*.*")])
+        if not path:
+            return
+
+        def report(count): # Runs on the import thread, so hand the update to the Tk thread
+            if not self.import_stop.is_set(): # The window is closing
+                self.import_worker.post(self.set_status, f"Importing... {count} rows read.")
+
+        def imported(result):
+            self.import_button.config(state=tk.NORMAL)
+            message = f"Imported {result.imported} customers."
+            if result.rejected:
+                message += f"\n\n{result.rejected} rows were rejected; see {result.reject_file} for the reasons."
+            messagebox.showinfo("Import Complete", message)
+            self.refresh_customer_view()
+
+        def failed(e):
+            self.import_button.config(state=tk.NORMAL)
+            messagebox.showerror("Import Error", f"The import stopped: {e}")
+            self.refresh_customer_view() # Batches committed before the error are kept
+
+        self.import_button.config(state=tk.DISABLED)
+        self.set_status(f"Importing {os.path.basename(path)}...")
+        from customerImport import import_file
+        if self.import_worker is None:
+            self.import_worker = DBWorker(self.root, DB_FILE, daemon=False) # Finishes its batch after the window closes
+        self.import_worker.submit(lambda: import_file(DB_FILE, path, progress=report, stop=self.import_stop),
+                                  on_done=imported, on_error=failed, name="import file")
+
+    def add_customer(self, customer):
+        """Appends a newly inserted customer as one new tile and selects it."""
+        if self.search_text:
+            self.refresh_customer_view() # The new customer may not match the search
+            return
+        self.customers.append(customer)
+        self.update_scroll_region()
+        self.render_visible_tiles()
+        self.select_customer(len(self.customers) - 1)
+
+    def remove_customers(self, first_id, count):
+        """
+        Drops the tiles of `count` deleted customers, the first of which had
+        `first_id`, and reflows only the tiles from that point on.
+        """
+        # Rows before the first deleted id are unaffected, so its old index still holds
+        # (looked up now, since other changes may have moved it while the delete ran).
+        source = self.customers
+        if not isinstance(source, CustomerPageSource): return
+        index = source.cached_index_of(first_id)
+        if index is not None:
+            self.remove_customers_at(index, count)
+            return
+
+        def counted(index):
+            if source is self.customers:
+                self.remove_customers_at(index, count)
+        self.worker.submit(lambda: source.count_before(first_id), on_done=counted,
+                           on_error=lambda e: self.set_status(f"Error: could not update the view: {e}"),
+                           name="locate deleted customers")
+
+    def remove_customers_at(self, index, count):
+        """Drops the tiles of `count` deleted customers starting at grid index `index` (see remove_customers())."""
+        self.customers.remove_rows(index, count)
+        self.selected_id, self.selected_ids, self.anchor_id = None, set(), None
+        self.update_scroll_region()
+        self.render_visible_tiles(relayout_from=index)
+        if self.customers:
+            self.select_customer(min(index, len(self.customers) - 1))
+        else:
+            self.current_selection = (0, 0)
+            self.clear_details()
 
     def refresh_customer_view(self):
-        """Clears and reloads the customer warehouse view."""
-        for widget in self.canvas_frame.winfo_children(): widget.destroy()
-        for widget in self.detail_widgets.values():
-            widget.config(state="normal"); widget.delete(0, tk.END); widget.config(state="readonly")
-        self.customers, self.warehouse_buttons = [], []
-        self.current_selection = (0, 0)
-        self.load_customers_from_db()
-        self.populate_warehouse()
-        if self.warehouse_buttons:
-            self.warehouse_buttons[0][0].focus_set()
-            self.warehouse_buttons[0][0].invoke()
+        """Reloads the customers in the background and rebinds the existing tiles to them."""
+        if self.editing:
+            self.end_edit() # The customer being edited may not be in the new view
+        self.clear_details()
+        self.current_selection, self.selected_id = (0, 0), None
+        self.selected_ids, self.anchor_id = set(), None
+        finished = profiling.begin("refresh")
+
+        def reloaded():
+            self.show_first_customer()
+            finished()
+        self.load_customers_from_db(on_loaded=reloaded)
+
+    def apply_outside_changes(self):
+        """
+        Catches up with a commit made elsewhere (another station, a tool, or
+        this window's own writes): recounts and re-reads only the pages of the
+        tiles in view on the worker thread, then swaps them in. The tiles keep
+        showing the old rows until then, and the scroll position, selection
+        and details panel stay put, unlike a full refresh.
+        """
+        source = self.customers
+        if not isinstance(source, CustomerPageSource):
+            return # Still loading, or the last load failed
+        page_numbers = {index // source.page_size for index in self.visible_tiles}
+
+        def reread(result):
+            if source is not self.customers: return # A reload replaced this source
+            count = result[0]
+            source.replace_pages(*result)
+            self.update_scroll_region()
+            self.render_visible_tiles(relayout_from=0)
+            self.refresh_details()
+            if self.search_text:
+                self.set_status(f"{count} customers match '{self.search_text}'.")
+            else:
+                self.set_status(f"{count} customers in database.")
+
+        self.worker.submit(lambda: source.read_pages(page_numbers), on_done=reread,
+                           on_error=lambda e: self.set_status(f"Error: could not check for changes: {e}"),
+                           name="reread customers")
+
+    def refresh_details(self):
+        """Re-reads the customer in the details panel, clearing it if they were deleted."""
+        if self.editing:
+            return # Saving checks for changes made elsewhere meanwhile
+        selected_id = self.selected_id
+        if selected_id is None:
+            return
+
+        def found(index):
+            def show():
+                customer = self.customers.get_cached(index)
+                if customer is not None and customer[0] == selected_id == self.selected_id:
+                    self.display_details(customer)
+            self.request_page(index // self.customers.page_size, then=show)
+
+        def missing():
+            if self.selected_id == selected_id:
+                self.forget_customer(selected_id)
+        self.locate_customer(selected_id, found, missing)
+
+    def close(self):
+        """
+        Commits any queued writes, pauses any schema upgrade, stops any import
+        at a batch boundary, drops the reads
+        still queued, then closes the window. Results still on their way to the
+        window are dropped.
+        """
+        if self.watcher:
+            self.watcher.stop()
+        get_handoff(self.root).close()
+        self.writes.close() # Every acknowledged change is on disk before the window goes
+        self.upgrade_stop.set() # An unfinished upgrade resumes on the next start
+        if self.upgrade_worker:
+            self.upgrade_worker.shutdown(wait=False) # Its current batch commits before the program exits
+        self.import_stop.set() # A running import stops after its current batch
+        if self.import_worker:
+            self.import_worker.shutdown(wait=False) # That batch commits before the program exits
+        self.worker.shutdown(cancel=True)
+        self.profiler.shutdown()
+        self.root.destroy()
 
 
 if __name__ == "__main__":
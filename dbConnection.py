@@ -0,0 +1,145 @@
+import atexit
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# --- Configuration ---
+# PRAGMAs applied to every new connection. WAL lets readers and a writer work
+# at the same time; note that SQLite only supports WAL on local disks, so set
+# "journal_mode" to "DELETE" if the database lives on a network share.
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL", # Safe with WAL; skips an fsync on every commit
+    "cache_size": -16000,    # Negative means KiB, so roughly 16 MB of page cache
+    "mmap_size": 268435456,  # Read pages straight from a 256 MB memory map
+    "temp_store": "MEMORY",
+}
+# How many prepared statements each connection keeps compiled.
+STATEMENT_CACHE_SIZE = 256
+# How long a statement waits for another process's lock before failing with
+# "database is locked" (SQLite's busy timeout).
+BUSY_TIMEOUT_MS = 5000
+# After that, how many more times retry_busy() tries, and its first pause in
+# seconds (doubled, with some jitter, on each attempt).
+BUSY_RETRIES = 4
+BUSY_BACKOFF = 0.1
+# ---------------------
+
+
+class ConnectionManager:
+    """
+    Owns long-lived, tuned connections to one SQLite database file.
+
+    Each thread gets its own connection the first time it asks for one and
+    keeps it afterwards, so the GUI thread and any background workers never
+    reconnect per operation and never share a connection between threads.
+    """
+    def __init__(self, db_file, pragmas=None):
+        self.db_file = db_file
+        self.pragmas = PRAGMAS if pragmas is None else pragmas
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def connection(self):
+        """Returns this thread's connection, opening and tuning it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # check_same_thread is off only so close_all() can run from the main
+            # thread; each connection is still used by the thread that opened it.
+            conn = sqlite3.connect(self.db_file, cached_statements=STATEMENT_CACHE_SIZE,
+                                   timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+            for name, value in self.pragmas.items():
+                # Switching to WAL needs a moment with no other process in the file
+                retry_busy(lambda: conn.execute(f"PRAGMA {name} = {value}"))
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def execute(self, sql, params=()):
+        """Runs one statement on this thread's connection and returns the cursor."""
+        return self.connection().execute(sql, params)
+
+    def query(self, sql, params=()):
+        """Runs one query on this thread's connection and returns all of its rows."""
+        return self.connection().execute(sql, params).fetchall()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Yields this thread's connection inside a transaction, committing on
+        success and rolling back on error. The transaction is begun explicitly
+        because the sqlite3 module only does so before INSERT/UPDATE/DELETE,
+        which would leave schema changes committing one statement at a time.
+        It is begun IMMEDIATE, taking the write lock (or waiting for it) up
+        front: a transaction that reads first and only later asks for the lock
+        fails at once with "database is locked" if another process has written
+        since, however long the busy timeout.
+        """
+        conn = self.connection()
+        with conn:
+            if not conn.in_transaction:
+                retry_busy(lambda: conn.execute("BEGIN IMMEDIATE"))
+            yield conn
+
+    def data_version(self):
+        """
+        Returns this thread's connection's PRAGMA data_version, which changes
+        whenever another connection (in this process or any other) commits.
+        """
+        return self.connection().execute("PRAGMA data_version").fetchone()[0]
+
+    def close_all(self):
+        """Closes every connection opened through this manager."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+
+def is_busy(error):
+    """Tells whether an error means another connection held a lock for longer than the busy timeout."""
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in str(error) or "busy" in str(error))
+
+def retry_busy(work, retries=BUSY_RETRIES, backoff=BUSY_BACKOFF):
+    """
+    Calls `work()` and returns its result, calling it again after a growing,
+    jittered pause if it fails because the database is locked. `work` must be
+    safe to repeat: e.g. a whole transaction, which a busy error rolls back.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return work()
+        except sqlite3.OperationalError as e:
+            if attempt == retries or not is_busy(e):
+                raise
+        time.sleep(backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+def get_manager(db_file):
+    """Returns the shared ConnectionManager for a database file."""
+    path = os.path.abspath(db_file)
+    with _managers_lock:
+        manager = _managers.get(path)
+        if manager is None:
+            manager = _managers[path] = ConnectionManager(path)
+        return manager
+
+@atexit.register
+def close_all_managers():
+    """Closes every shared connection (checkpointing the WAL) when the program exits."""
+    with _managers_lock:
+        managers = list(_managers.values())
+    for manager in managers:
+        manager.close_all()
@@ -0,0 +1,133 @@
+import queue
+import threading
+import profiling
+from dbConnection import get_manager
+from tkHandoff import get_handoff
+
+
+class Job:
+    """A handle for work submitted to a DBWorker; cancel() drops any undelivered results."""
+    def __init__(self, name):
+        self.name = name # Its span name in profiling.py's timings
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Stops delivering results for this job (and stops a stream at its next chunk)."""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+
+class DBWorker:
+    """
+    Runs database reads and writes on a background thread so the Tk mainloop never blocks.
+
+    This is the pattern from Oct22.py made reusable: the work runs on a
+    threading.Thread and results are handed back to the main loop through
+    the window's TkHandoff, so every callback runs on the Tk thread and the
+    worker never calls into Tk itself (which is what lets shutdown() wait for
+    it). Jobs run one at a time, in the order they were submitted, on the
+    worker's own long-lived connection from dbConnection.
+    """
+    def __init__(self, root, db_file, daemon=True):
+        self.root = root
+        self.handoff = get_handoff(root)
+        self.db = get_manager(db_file)
+        self.jobs = queue.Queue()
+        self.stopping = threading.Event() # Set by shutdown(cancel=True): drop the work still queued
+        # A non-daemon worker finishes its current job even after the window
+        # has gone: the program waits for it before exiting.
+        self.thread = threading.Thread(target=self._run, daemon=daemon)
+        self.thread.start()
+
+    def _run(self):
+        """Worker loop: runs queued jobs until shutdown() is called."""
+        while True:
+            item = self.jobs.get()
+            if item is None:
+                break
+            job, work, on_done, on_error = item
+            if job.cancelled or self.stopping.is_set():
+                continue
+            try:
+                with profiling.span(job.name):
+                    result = work(job)
+            except Exception as e:
+                self._post(job, on_error or self._raise, e)
+            else:
+                self._post(job, on_done, result)
+
+    def _post(self, job, callback, *args):
+        """Schedules a callback on the Tk thread, unless the job is cancelled by then."""
+        if callback is None or job.cancelled:
+            return
+        self.handoff.post(self._deliver, job, callback, args)
+
+    def post(self, callback, *args):
+        """
+        Runs `callback(*args)` on the Tk thread. For work running on the
+        worker thread that reports progress before it returns.
+        """
+        self.handoff.post(callback, *args)
+
+    @staticmethod
+    def _deliver(job, callback, args):
+        if not job.cancelled:
+            callback(*args)
+
+    @staticmethod
+    def _raise(error):
+        raise error
+
+    def submit(self, work, on_done=None, on_error=None, name="db job"):
+        """
+        Runs `work()` on the worker thread. Its return value is passed to
+        `on_done`, or the exception it raised to `on_error`, on the Tk thread.
+        `name` labels the job's time in the profiling overlay.
+        """
+        job = Job(name)
+        self.jobs.put((job, lambda job: work(), on_done, on_error))
+        return job
+
+    def stream(self, sql, params=(), on_chunk=None, on_done=None, on_error=None,
+               chunk_size=500, first_chunk_size=None, name="db stream"):
+        """
+        Runs a query on the worker thread and hands its rows to `on_chunk` in
+        batches read with fetchmany(). `on_done` receives the total row count.
+        Cancelling the returned job stops the read at the next batch.
+        """
+        def work(job):
+            cursor = self.db.execute(sql, params)
+            total, size = 0, first_chunk_size or chunk_size
+            try:
+                while not job.cancelled and not self.stopping.is_set():
+                    rows = cursor.fetchmany(size)
+                    if not rows:
+                        break
+                    total += len(rows)
+                    self._post(job, on_chunk, rows)
+                    size = chunk_size
+            finally:
+                cursor.close()
+            return total
+
+        job = Job(name)
+        self.jobs.put((job, work, on_done, on_error))
+        return job
+
+    def shutdown(self, cancel=False, wait=True):
+        """
+        Lets the jobs already queued finish, then stops the worker thread.
+        With `cancel`, jobs not yet started are dropped and a running stream
+        stops at its next batch instead, so closing a window does not wait
+        for a long load. With `wait=False` it returns at once and the thread
+        stops on its own (a non-daemon worker still finishes before the
+        program exits).
+        """
+        if cancel:
+            self.stopping.set()
+        self.jobs.put(None)
+        if wait:
+            self.thread.join()
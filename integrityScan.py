@@ -0,0 +1,188 @@
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from dbConnection import get_manager
+from customerValidation import CUSTOMER_FIELDS, validate_record
+
+# --- Configuration ---
+# Rows read per fetchmany() call; with a process pool, each chunk is one task.
+CHUNK_SIZE = 20000
+# Ids looked up per query when confirming duplicate candidates.
+LOOKUP_SIZE = 500
+# ---------------------
+
+SCAN_SQL = f"SELECT id, {', '.join(CUSTOMER_FIELDS)} FROM Customer ORDER BY id"
+_NON_DIGITS = re.compile(r"[^0-9]")
+# Values that count as the same email or phone number when looking for duplicates.
+DUPLICATE_KEYS = {
+    "Email": lambda value: value.strip().casefold(),
+    "PhoneNumber": lambda value: _NON_DIGITS.sub("", value),
+}
+
+
+def value_hash(text):
+    """
+    An 8-byte hash of a normalized value. hashlib is used instead of hash()
+    because str hashes differ between processes, and pool workers must agree.
+    """
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+
+def check_rows(rows):
+    """
+    Checks one chunk of (id, *CUSTOMER_FIELDS) rows against the entry rules.
+    Returns (problems, hashes): problems is a list of (id, column, value,
+    message) and hashes maps each DUPLICATE_KEYS column to (hash, id) pairs
+    for its non-empty values. Runs in pool workers, so it only uses its arguments.
+    """
+    problems = []
+    hashes = {column: [] for column in DUPLICATE_KEYS}
+    for row in rows:
+        customer_id = row[0]
+        record = {field: "" if value is None else value if isinstance(value, str) else str(value)
+                  for field, value in zip(CUSTOMER_FIELDS, row[1:])}
+        for column, message in validate_record(record).items():
+            problems.append((customer_id, column, record[column], message))
+        for column, normalize in DUPLICATE_KEYS.items():
+            key = normalize(record[column])
+            if key:
+                hashes[column].append((value_hash(key), customer_id))
+    return problems, hashes
+
+
+class ScanResult:
+    """What a scan found: rows that break the entry rules and groups of duplicate values."""
+    def __init__(self):
+        self.rows_scanned = 0
+        self.problems = [] # (id, column, value, message)
+        self.duplicates = {column: {} for column in DUPLICATE_KEYS} # column -> {normalized value: [ids]}
+        self._seen = {column: {} for column in DUPLICATE_KEYS} # column -> {hash: first id}
+        self._candidates = {column: {} for column in DUPLICATE_KEYS} # column -> {hash: [ids]}
+
+    def add_chunk(self, row_count, problems, hashes):
+        """Merges the output of check_rows() for one chunk."""
+        self.rows_scanned += row_count
+        self.problems.extend(problems)
+        for column, pairs in hashes.items():
+            seen, candidates = self._seen[column], self._candidates[column]
+            for digest, customer_id in pairs:
+                first_id = seen.setdefault(digest, customer_id)
+                if first_id != customer_id:
+                    candidates.setdefault(digest, [first_id]).append(customer_id)
+
+    def confirm_duplicates(self, db):
+        """
+        Turns rows whose hashes matched into duplicate groups, comparing the
+        actual values so that a hash collision is never reported.
+        """
+        for column, candidates in self._candidates.items():
+            normalize = DUPLICATE_KEYS[column]
+            ids = [customer_id for group in candidates.values() for customer_id in group]
+            groups = {}
+            for start in range(0, len(ids), LOOKUP_SIZE):
+                chunk = ids[start:start + LOOKUP_SIZE]
+                placeholders = ", ".join("?" for _ in chunk)
+                for customer_id, value in db.query(
+                        f"SELECT id, {column} FROM Customer WHERE id IN ({placeholders})", chunk):
+                    groups.setdefault(normalize(str(value)), []).append(customer_id)
+            self.duplicates[column] = {key: sorted(group) for key, group in groups.items() if len(group) > 1}
+        self._seen = self._candidates = None # Only needed while scanning
+
+    def write_report(self, path, db_file):
+        """Writes a plain-text report: a summary first, then every problem and duplicate group."""
+        counts = Counter(column for _, column, _, _ in self.problems)
+        bad_rows = len({customer_id for customer_id, _, _, _ in self.problems})
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"Integrity scan of {db_file}\n\n")
+            f.write(f"Rows scanned: {self.rows_scanned}\n")
+            f.write(f"Rows breaking the entry rules: {bad_rows}\n")
+            for column in CUSTOMER_FIELDS:
+                if counts[column]:
+                    f.write(f"    {column}: {counts[column]}\n")
+            for column, groups in self.duplicates.items():
+                f.write(f"Duplicate {column} values: {len(groups)} "
+                        f"({sum(len(ids) for ids in groups.values())} rows)\n")
+
+            f.write("\n--- Rows breaking the entry rules ---\n")
+            for customer_id, column, value, message in sorted(self.problems):
+                f.write(f"id {customer_id}: {column} {value!r}: {message}\n")
+            for column, groups in self.duplicates.items():
+                f.write(f"\n--- Duplicate {column} values ---\n")
+                for key in sorted(groups):
+                    f.write(f"{key}: ids {', '.join(str(customer_id) for customer_id in groups[key])}\n")
+
+
+def scan_database(db_file, workers=0, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Streams the Customer table in chunks and checks every row against the
+    entry rules, then finds duplicate emails and phone numbers by hashing
+    their normalized values (one dictionary lookup per row, instead of
+    comparing rows with each other). With `workers` > 1 the checks run in a
+    process pool while this process keeps reading. `progress`, if given, is
+    called with the number of rows scanned after each chunk.
+    """
+    db = get_manager(db_file)
+    result = ScanResult()
+    cursor = db.execute(SCAN_SQL)
+    chunks = iter(lambda: cursor.fetchmany(chunk_size), [])
+
+    def merge(row_count, checked):
+        result.add_chunk(row_count, *checked)
+        if progress:
+            progress(result.rows_scanned)
+
+    try:
+        if workers > 1:
+            with ProcessPoolExecutor(workers) as pool:
+                pending = deque() # At most two chunks per worker in flight, so memory stays bounded
+                for rows in chunks:
+                    pending.append((len(rows), pool.submit(check_rows, rows)))
+                    if len(pending) >= workers * 2:
+                        row_count, future = pending.popleft()
+                        merge(row_count, future.result())
+                while pending:
+                    row_count, future = pending.popleft()
+                    merge(row_count, future.result())
+        else:
+            for rows in chunks:
+                merge(len(rows), check_rows(rows))
+    finally:
+        cursor.close()
+    result.confirm_duplicates(db)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check every customer against the entry rules and look for duplicates.")
+    parser.add_argument("--db", default="customers.db", help="database file (default: customers.db)")
+    parser.add_argument("--report", default="integrity_report.txt", help="report file (default: integrity_report.txt)")
+    parser.add_argument("--workers", type=int, default=0,
+                        help=f"check rows in this many processes (this machine has {os.cpu_count()} CPUs)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"Database file not found: '{args.db}'")
+        return 1
+
+    def report(count):
+        print(f"\r{count} rows scanned...", end="", flush=True)
+
+    try:
+        result = scan_database(args.db, args.workers, progress=report)
+        result.write_report(args.report, args.db)
+    except (OSError, sqlite3.Error) as e:
+        print(f"\nScan failed: {e}")
+        return 1
+    bad_rows = len({customer_id for customer_id, _, _, _ in result.problems})
+    print(f"\nScanned {result.rows_scanned} customers: {bad_rows} break the entry rules, "
+          f"{len(result.duplicates['Email'])} duplicate emails, "
+          f"{len(result.duplicates['PhoneNumber'])} duplicate phone numbers.")
+    print(f"Report written to {args.report}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
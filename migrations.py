@@ -0,0 +1,298 @@
+import argparse
+import sqlite3
+import sys
+from contextlib import contextmanager
+from dbConnection import get_manager
+from changeLog import create_change_log
+from customerValidation import CUSTOMER_FIELDS, DATE_PATTERN, is_valid_date
+
+# --- Configuration ---
+# Rows updated per transaction while filling in new columns, so other
+# connections (the GUIs) never wait long for the write lock.
+BACKFILL_BATCH_SIZE = 5000
+# ---------------------
+
+# Birthday is entered as MM-DD-YYYY (months and days may have one digit).
+# These turn it into an ISO date (YYYY-MM-DD) in plain SQL, so the triggers
+# work from any SQLite client; anything that is not a real date becomes NULL.
+_BIRTHDAY_FORMATS = (
+    # (GLOB pattern, year start, month start, month length, day start, day length)
+    ("[0-9][0-9]-[0-9][0-9]-[0-9][0-9][0-9][0-9]", 7, 1, 2, 4, 2),
+    ("[0-9]-[0-9][0-9]-[0-9][0-9][0-9][0-9]", 6, 1, 1, 3, 2),
+    ("[0-9][0-9]-[0-9]-[0-9][0-9][0-9][0-9]", 6, 1, 2, 4, 1),
+    ("[0-9]-[0-9]-[0-9][0-9][0-9][0-9]", 5, 1, 1, 3, 1),
+)
+
+def iso_birthday_sql(column):
+    """Returns an SQL expression converting an MM-DD-YYYY `column` to YYYY-MM-DD, or NULL."""
+    cases = []
+    for pattern, year, month, month_length, day, day_length in _BIRTHDAY_FORMATS:
+        iso = (f"substr({column}, {year}, 4) || '-' || substr('0' || substr({column}, {month}, {month_length}), -2)"
+               f" || '-' || substr('0' || substr({column}, {day}, {day_length}), -2)")
+        # A '+0 days' modifier makes date() roll impossible dates over (02-30
+        # becomes 03-02), so only dates that survive the round trip are kept.
+        cases.append(f"WHEN {column} GLOB '{pattern}' AND date({iso}, '+0 days') = {iso} THEN {iso}")
+    return f"CASE {' '.join(cases)} END"
+
+def phone_digits_sql(column):
+    """Returns an SQL expression that strips the usual punctuation from a phone number."""
+    expression = column
+    for character in ("-", " ", "(", ")", ".", "+"):
+        expression = f"replace({expression}, '{character}', '')"
+    return expression
+
+def iso_birthday(text):
+    """The Python twin of iso_birthday_sql(), for code that inserts BirthdayISO itself."""
+    if not text or not is_valid_date(text):
+        return None
+    month, day, year = DATE_PATTERN.fullmatch(text).groups()
+    return f"{year}-{int(month):02d}-{int(day):02d}"
+
+def month_day(iso):
+    """The Python twin of MONTH_DAY_SQL: 312 for a BirthdayISO of 'YYYY-03-12'."""
+    return int(iso[5:7]) * 100 + int(iso[8:10]) if iso else None
+
+def phone_digits(text):
+    """The Python twin of phone_digits_sql()."""
+    if text is None:
+        return None
+    for character in ("-", " ", "(", ")", ".", "+"):
+        text = text.replace(character, "")
+    return text
+
+NORMALIZE_SQL = (f"BirthdayISO = {iso_birthday_sql('Birthday')}, "
+                 f"PhoneDigits = {phone_digits_sql('PhoneNumber')}")
+# The birthday's month and day as one number (March 12 is 312), from BirthdayISO.
+MONTH_DAY_SQL = "BirthdayMonthDay = CAST(replace(substr(BirthdayISO, 6), '-', '') AS INTEGER)"
+
+
+@contextmanager
+def paused_trigger(conn, name):
+    """
+    Drops trigger `name` for the duration of the block and recreates it at the
+    end, inside the caller's transaction, so other connections never see it
+    missing. Yields whether the trigger exists. Bulk inserts use this to skip
+    the per-row normalizing UPDATE and insert the normalized values directly.
+    """
+    trigger = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (name,)).fetchone()
+    if trigger is None:
+        yield False
+        return
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE") # The DROP must not commit on its own
+    conn.execute(f"DROP TRIGGER {name}")
+    yield True
+    conn.execute(trigger[0])
+
+
+def create_customer_table(db, progress, stop):
+    """Creates the Customer table (the original schema) if it does not exist."""
+    with db.transaction() as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS Customer (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, Name TEXT NOT NULL, Birthday TEXT NOT NULL,
+                Email TEXT NOT NULL, PhoneNumber TEXT, Address TEXT, PreferredContact TEXT NOT NULL
+            );
+        """)
+
+def add_normalized_columns(db, progress, stop):
+    """
+    Adds BirthdayISO (the birthday as YYYY-MM-DD, which sorts and compares as
+    a date) and PhoneDigits (the phone number without punctuation), and
+    triggers that keep them up to date on every insert and update. Birthday
+    and PhoneNumber themselves are left exactly as entered.
+    """
+    with db.transaction() as conn:
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(Customer)")}
+        for column in ("BirthdayISO", "PhoneDigits"):
+            if column not in existing:
+                conn.execute(f"ALTER TABLE Customer ADD COLUMN {column} TEXT")
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS Customer_normalize_insert AFTER INSERT ON Customer BEGIN
+                UPDATE Customer SET {NORMALIZE_SQL} WHERE id = new.id;
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS Customer_normalize_update AFTER UPDATE OF Birthday, PhoneNumber ON Customer BEGIN
+                UPDATE Customer SET {NORMALIZE_SQL} WHERE id = new.id;
+            END
+        """)
+
+def _backfill(db, assignments, progress, stop):
+    """
+    Runs `UPDATE Customer SET <assignments>` over every row, a batch of rows
+    per transaction. Returns False if `stop` was set before it finished; it
+    is safe to rerun from the start.
+    """
+    last_id, done = 0, 0
+    total = db.query("SELECT COUNT(*) FROM Customer")[0][0]
+    while True:
+        if stop and stop.is_set():
+            return False
+        with db.transaction() as conn:
+            ids = conn.execute("SELECT id FROM Customer WHERE id > ? ORDER BY id LIMIT ?",
+                               (last_id, BACKFILL_BATCH_SIZE)).fetchall()
+            if not ids:
+                return True
+            conn.execute(f"UPDATE Customer SET {assignments} WHERE id > ? AND id <= ?", (last_id, ids[-1][0]))
+        last_id, done = ids[-1][0], done + len(ids)
+        progress(f"Upgrading customer records... {min(done, total)} of {total}")
+
+def backfill_normalized_columns(db, progress, stop):
+    """Fills in BirthdayISO and PhoneDigits for the rows that existed before the triggers."""
+    return _backfill(db, NORMALIZE_SQL, progress, stop)
+
+def add_lookup_indexes(db, progress, stop):
+    """
+    Indexes Name and Email (case-insensitively, shared with the search and
+    sort indexes of the same name) and the ISO birthday.
+    """
+    progress("Indexing customer records...")
+    with db.transaction() as conn:
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_Customer_Name_sort ON Customer (Name COLLATE NOCASE)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_Customer_Email_sort ON Customer (Email COLLATE NOCASE)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_Customer_BirthdayISO_sort ON Customer (BirthdayISO)")
+
+def add_birthday_month_day(db, progress, stop):
+    """
+    Adds BirthdayMonthDay (month * 100 + day), indexed, so "birthdays in the
+    next N days" and "birthdays in month M" are index range scans. The
+    normalizing triggers are replaced by versions that also keep it current.
+    """
+    with db.transaction() as conn:
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(Customer)")}
+        if "BirthdayMonthDay" not in existing:
+            conn.execute("ALTER TABLE Customer ADD COLUMN BirthdayMonthDay INTEGER")
+        conn.execute("DROP TRIGGER IF EXISTS Customer_normalize_insert")
+        conn.execute("DROP TRIGGER IF EXISTS Customer_normalize_update")
+        conn.execute(f"""
+            CREATE TRIGGER Customer_normalize_insert AFTER INSERT ON Customer BEGIN
+                UPDATE Customer SET {NORMALIZE_SQL} WHERE id = new.id;
+                UPDATE Customer SET {MONTH_DAY_SQL} WHERE id = new.id;
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER Customer_normalize_update AFTER UPDATE OF Birthday, PhoneNumber ON Customer BEGIN
+                UPDATE Customer SET {NORMALIZE_SQL} WHERE id = new.id;
+                UPDATE Customer SET {MONTH_DAY_SQL} WHERE id = new.id;
+            END
+        """)
+
+def backfill_birthday_month_day(db, progress, stop):
+    """Fills in BirthdayMonthDay for existing rows, then indexes it."""
+    if not _backfill(db, MONTH_DAY_SQL, progress, stop):
+        return False
+    progress("Indexing birthdays...")
+    with db.transaction() as conn:
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_Customer_BirthdayMonthDay ON Customer (BirthdayMonthDay)")
+
+def add_change_log(db, progress, stop):
+    """
+    Adds the CustomerChanges log and its triggers (see changeLog.py), so open
+    windows can catch up with other stations' changes without reloading.
+    """
+    with db.transaction() as conn:
+        create_change_log(conn)
+
+def add_row_version(db, progress, stop):
+    """
+    Adds RowVersion, which starts at 1 and goes up by one whenever a customer
+    is updated, so an edit can be saved only if nobody else saved one since
+    it began (optimistic concurrency). The manager's edits increase it in
+    their own UPDATE; a trigger does it for any other client's updates.
+    """
+    with db.transaction() as conn:
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(Customer)")}
+        if "RowVersion" not in existing:
+            conn.execute("ALTER TABLE Customer ADD COLUMN RowVersion INTEGER NOT NULL DEFAULT 1")
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS Customer_row_version AFTER UPDATE OF {', '.join(CUSTOMER_FIELDS)} ON Customer
+            WHEN new.RowVersion = old.RowVersion BEGIN
+                UPDATE Customer SET RowVersion = old.RowVersion + 1 WHERE id = new.id;
+            END
+        """)
+
+def add_search_index(db, progress, stop):
+    """
+    Adds the full-text search index, its triggers and the case-insensitive
+    search indexes (see customerSearch.create_search_index()). The rows
+    already in Customer are indexed by the next migration, in batches.
+    """
+    from customerSearch import create_search_index # customerSearch imports this module
+    progress("Indexing customer records...")
+    with db.transaction() as conn:
+        create_search_index(conn)
+
+def backfill_search_index(db, progress, stop):
+    """
+    Indexes the existing rows for search, BACKFILL_BATCH_SIZE per
+    transaction, so other stations are never locked out for long. Picks up
+    where it stopped if interrupted; search uses LIKE until it is done.
+    """
+    from customerSearch import index_next_rows
+    done, total = 0, db.query("SELECT COUNT(*) FROM Customer")[0][0]
+    while True:
+        if stop and stop.is_set():
+            return False
+        with db.transaction() as conn:
+            indexed = index_next_rows(conn, BACKFILL_BATCH_SIZE)
+        if not indexed:
+            return True
+        done += indexed
+        progress(f"Indexing customers for search... {min(done, total)} of {total}")
+
+# Applied in order; a database at version N (PRAGMA user_version) has had the first N.
+MIGRATIONS = [
+    create_customer_table,
+    add_normalized_columns,
+    backfill_normalized_columns,
+    add_lookup_indexes,
+    add_birthday_month_day,
+    backfill_birthday_month_day,
+    add_change_log,
+    add_row_version,
+    add_search_index,
+    backfill_search_index,
+]
+LATEST_VERSION = len(MIGRATIONS)
+
+
+def schema_version(db_file):
+    """Returns the database's schema version, as recorded in PRAGMA user_version."""
+    return get_manager(db_file).query("PRAGMA user_version")[0][0]
+
+def migrate(db_file, progress=None, stop=None):
+    """
+    Brings the database up to LATEST_VERSION, running each missing migration
+    in turn and recording the new version after each one, so an interrupted
+    upgrade carries on where it stopped next time. `progress`, if given, is
+    called with status messages; setting the `stop` event (a threading.Event)
+    ends a long migration early without recording it. Returns how many
+    migrations were applied.
+    """
+    db = get_manager(db_file)
+    report = progress or (lambda message: None)
+    start = schema_version(db_file)
+    for version in range(start, LATEST_VERSION):
+        if MIGRATIONS[version](db, report, stop) is False:
+            return version - start
+        with db.transaction() as conn:
+            conn.execute(f"PRAGMA user_version = {version + 1}")
+    return max(LATEST_VERSION - start, 0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Upgrade a customer database to the latest schema.")
+    parser.add_argument("--db", default="customers.db", help="database file (default: customers.db)")
+    args = parser.parse_args(argv)
+    try:
+        print(f"Schema version {schema_version(args.db)}; latest is {LATEST_VERSION}.")
+        applied = migrate(args.db, progress=lambda message: print(f"\r{message}", end="", flush=True))
+    except sqlite3.Error as e:
+        print(f"\nMigration failed: {e}")
+        return 1
+    print(f"\nApplied {applied} migrations; the database is at version {LATEST_VERSION}.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
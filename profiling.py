@@ -0,0 +1,346 @@
+import os
+import sys
+import threading
+import time
+import tkinter as tk
+from contextlib import nullcontext
+from functools import wraps
+from tkinter import ttk
+
+# --- Configuration ---
+# Set CUSTOMER_PROFILE=1 to time spans from start-up, or to "cprofile" or
+# "trace" to also record a profile or trace until the window closes.
+PROFILE_ENV = os.environ.get("CUSTOMER_PROFILE", "")
+# Profiles and traces are written here, named by the time recording started.
+CAPTURE_DIR = os.environ.get("CUSTOMER_PROFILE_DIR", ".")
+# Most span events kept for one trace; later ones are counted but dropped.
+TRACE_LIMIT = 1000000
+# How often (ms) the overlay and the status-bar readout refresh.
+REFRESH_MS = 500
+# ---------------------
+
+_enabled = PROFILE_ENV != ""
+_lock = threading.Lock()
+_stats = {} # span name -> SpanStats
+_recent = [] # (name, seconds) of the last few distinct spans, newest last
+_trace = None # Span events while a trace is being recorded, else None
+_trace_dropped = 0
+_profiler = None # The cProfile.Profile while one is recording, else None
+_capture_start = 0.0
+_NULL_SPAN = nullcontext()
+_NO_OP = lambda: None
+_IMPORTED = time.perf_counter() # Start-up times are measured from here
+
+
+class SpanStats:
+    """Running totals for one span name."""
+    __slots__ = ("count", "total", "max", "last")
+
+    def __init__(self):
+        self.count, self.total, self.max, self.last = 0, 0.0, 0.0, 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.start, self.start)
+        return False
+
+
+def enabled():
+    """True while spans are being timed."""
+    return _enabled
+
+def enable(on=True):
+    """Turns span timing on or off. Totals gathered so far are kept."""
+    global _enabled
+    _enabled = on
+
+def span(name):
+    """
+    A context manager that times its block as `name`. While timing is off it
+    returns one shared no-op context, so an idle span costs a function call
+    and a flag check.
+    """
+    return _Span(name) if _enabled else _NULL_SPAN
+
+def timed(name):
+    """Decorator form of span(): times every call of the function as `name`."""
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def begin(name):
+    """
+    Starts timing work that finishes in a later callback (a load handed to
+    the worker thread, say). Returns a function to call when it is done.
+    """
+    if not _enabled:
+        return _NO_OP
+    start = time.perf_counter()
+    return lambda: record(name, time.perf_counter() - start, start)
+
+def record(name, seconds, start=None):
+    """
+    Adds one timing for `name`. Safe to call from any thread.
+    """
+    global _trace_dropped
+    if not _enabled:
+        return
+    with _lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = SpanStats()
+        stats.add(seconds)
+        for position, (recent_name, _) in enumerate(_recent):
+            if recent_name == name:
+                del _recent[position]
+                break
+        _recent.append((name, seconds))
+        if len(_recent) > 3:
+            del _recent[0]
+        if _trace is not None:
+            if len(_trace) < TRACE_LIMIT:
+                begin = time.perf_counter() - seconds if start is None else start
+                _trace.append((name, begin, seconds, threading.get_ident()))
+            else:
+                _trace_dropped += 1
+
+def snapshot():
+    """Returns [(name, SpanStats copy)], the slowest in total first."""
+    with _lock:
+        items = []
+        for name, stats in _stats.items():
+            copy = SpanStats()
+            copy.count, copy.total, copy.max, copy.last = stats.count, stats.total, stats.max, stats.last
+            items.append((name, copy))
+    return sorted(items, key=lambda item: item[1].total, reverse=True)
+
+def reset():
+    """Forgets every timing gathered so far."""
+    with _lock:
+        _stats.clear()
+        _recent.clear()
+
+def readout():
+    """A one-line summary of the latest spans for a status bar, e.g. 'page query 3.1 ms · tiles 8.4 ms'."""
+    with _lock:
+        recent = list(_recent)
+    return " · ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in reversed(recent))
+
+
+# --- Recording profiles and traces ---
+def capturing():
+    """Returns "cprofile" or "trace" while one is being recorded, else None."""
+    if _profiler is not None:
+        return "cprofile"
+    return "trace" if _trace is not None else None
+
+def start_capture(kind):
+    """
+    Starts recording a cProfile profile of the Tk thread ("cprofile") or a
+    trace of every span on every thread ("trace"). Span timing is turned on
+    as well. Stop it with stop_capture(), which writes the file.
+    """
+    global _profiler, _trace, _trace_dropped, _capture_start
+    stop_capture()
+    enable()
+    _capture_start = time.time()
+    if kind == "cprofile":
+        import cProfile
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    else:
+        with _lock:
+            _trace, _trace_dropped = [], 0
+
+def stop_capture():
+    """Stops recording and writes the profile (.prof) or trace (.json). Returns its path, or None."""
+    global _profiler, _trace
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(_capture_start))
+    if _profiler is not None:
+        profiler, _profiler = _profiler, None
+        profiler.disable()
+        path = os.path.join(CAPTURE_DIR, f"customer-profile-{stamp}.prof")
+        profiler.dump_stats(path) # Read it with `python -m pstats` or snakeviz
+        return path
+    if _trace is not None:
+        with _lock:
+            events, _trace = _trace, None
+        path = os.path.join(CAPTURE_DIR, f"customer-trace-{stamp}.json")
+        write_trace(path, events)
+        return path
+    return None
+
+def write_trace(path, events):
+    """Writes span events in the Chrome trace format, for chrome://tracing or ui.perfetto.dev."""
+    import json
+    origin = min((event[1] for event in events), default=0.0)
+    trace = [{"name": name, "ph": "X", "ts": round((start - origin) * 1e6, 1), "dur": round(seconds * 1e6, 1),
+              "pid": os.getpid(), "tid": thread} for name, start, seconds, thread in events]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": trace, "otherData": {"droppedEvents": _trace_dropped}}, f)
+
+
+# --- Start-up ---
+def after_first_paint(root, callback):
+    """
+    Runs `callback` once `root` is on screen and drawn, so slow start-up work
+    (opening the database, the first query) does not hold the window back.
+    The time to first window is recorded as the "first window" span, and
+    also printed to stderr when CUSTOMER_PROFILE is set.
+    """
+    def mapped(event):
+        if event.widget is not root:
+            return # Child widgets' <Map> events reach the toplevel's bindings too
+        root.unbind("<Map>", binding)
+        # Idle handlers run in order, so the redraws queued by mapping come first.
+        root.after_idle(painted)
+
+    def painted():
+        seconds = time.perf_counter() - _IMPORTED
+        record("first window", seconds, _IMPORTED)
+        if PROFILE_ENV:
+            print(f"First window after {seconds * 1000:.0f} ms", file=sys.stderr, flush=True)
+        callback()
+
+    binding = root.bind("<Map>", mapped, add="+")
+
+
+# --- On-screen stats ---
+class StatsOverlay(tk.Toplevel):
+    """A small always-on-top window listing every span's calls and timings, refreshed live."""
+    COLUMNS = ("Calls", "Last ms", "Mean ms", "Max ms", "Total ms")
+
+    def __init__(self, root, on_close=None):
+        super().__init__(root)
+        self.title("Timings")
+        self.geometry("560x320")
+        self.attributes("-topmost", True)
+        self.on_close = on_close
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+        self.tree = ttk.Treeview(self, columns=self.COLUMNS)
+        self.tree.heading("#0", text="Span")
+        self.tree.column("#0", width=180)
+        for column in self.COLUMNS:
+            self.tree.heading(column, text=column)
+            self.tree.column(column, width=70, anchor="e")
+        self.tree.pack(fill="both", expand=True)
+
+        controls = ttk.Frame(self, padding=5)
+        controls.pack(fill="x")
+        ttk.Button(controls, text="Reset", command=reset).pack(side="left")
+        self.profile_button = ttk.Button(controls, command=lambda: self.toggle_capture("cprofile"))
+        self.profile_button.pack(side="left", padx=5)
+        self.trace_button = ttk.Button(controls, command=lambda: self.toggle_capture("trace"))
+        self.trace_button.pack(side="left")
+        self.capture_label = ttk.Label(controls, anchor="w")
+        self.capture_label.pack(side="left", fill="x", expand=True, padx=5)
+        self.update_buttons()
+        self.refresh_job = None
+        self.refresh()
+
+    def toggle_capture(self, kind):
+        """Starts recording `kind`, or stops the current recording and shows where it was saved."""
+        if capturing():
+            path = stop_capture()
+            self.capture_label.config(text=f"Saved {path}" if path else "")
+        else:
+            start_capture(kind)
+            self.capture_label.config(text=f"Recording {kind}...")
+        self.update_buttons()
+
+    def update_buttons(self):
+        current = capturing()
+        self.profile_button.config(text="Stop cProfile" if current == "cprofile" else "Record cProfile",
+                                   state="disabled" if current == "trace" else "normal")
+        self.trace_button.config(text="Stop Trace" if current == "trace" else "Record Trace",
+                                 state="disabled" if current == "cprofile" else "normal")
+
+    def refresh(self):
+        """Redraws the table from the current totals."""
+        self.tree.delete(*self.tree.get_children())
+        for name, stats in snapshot():
+            self.tree.insert("", "end", text=name, values=(
+                stats.count, f"{stats.last * 1000:.1f}", f"{stats.total / stats.count * 1000:.1f}",
+                f"{stats.max * 1000:.1f}", f"{stats.total * 1000:.0f}"))
+        self.refresh_job = self.after(REFRESH_MS, self.refresh)
+
+    def close(self):
+        if self.refresh_job:
+            self.after_cancel(self.refresh_job)
+        self.destroy()
+        if self.on_close:
+            self.on_close()
+
+
+class Profiler:
+    """
+    Connects the timing tools to one application window: F12 opens or closes
+    the stats overlay (and turns timing on), and while timing is on the
+    latest spans are shown in `readout_label`, if given.
+    """
+    def __init__(self, root, readout_label=None):
+        self.root = root
+        self.readout_label = readout_label
+        self.overlay = None
+        self.readout_job = None
+        root.bind("<F12>", self.toggle_overlay)
+        if PROFILE_ENV in ("cprofile", "trace"):
+            start_capture(PROFILE_ENV)
+        if _enabled:
+            self.update_readout()
+
+    def toggle_overlay(self, event=None):
+        if self.overlay is not None:
+            self.overlay.close()
+            return
+        enable()
+        self.overlay = StatsOverlay(self.root, on_close=self.overlay_closed)
+        if self.readout_job is None:
+            self.update_readout()
+
+    def overlay_closed(self):
+        self.overlay = None
+        if not capturing() and not PROFILE_ENV:
+            enable(False) # Back to no-op spans
+            if self.readout_label:
+                self.readout_label.config(text="")
+
+    def update_readout(self):
+        """Shows the latest spans in the status bar until timing is turned off."""
+        self.readout_job = None
+        if not _enabled or self.readout_label is None:
+            return
+        self.readout_label.config(text=readout())
+        self.readout_job = self.root.after(REFRESH_MS, self.update_readout)
+
+    def shutdown(self):
+        """Writes any profile or trace still recording. Call before the window is destroyed."""
+        if self.readout_job:
+            self.root.after_cancel(self.readout_job)
+        path = stop_capture()
+        if path:
+            print(f"Profile written to {path}")
@@ -1,40 +1,105 @@
 import sqlite3
 import os
+from array import array
 import tkinter as tk
-from tkinter import ttk, messagebox
+from collections import deque
+from tkinter import ttk, messagebox, filedialog
+from customerSource import CustomerPageSource
+from customerStore import CustomerStore
+from dbWorker import DBWorker
+from tkHandoff import get_handoff
+from changeWatcher import ChangeWatcher
+from changeLog import changes_since, has_change_log, last_change
+from sortKeys import SortKeyCache
+from customerSearch import ensure_search_index, search_filter
+import profiling
 
 # --- Configuration ---
 # The name of your database file.
 DB_FILE = "customers.db"
 # The name of the table inside your database.
 TABLE_NAME = "Customer" 
+# Rows in the first batch (about one screenful) and in each later batch.
+# One batch is inserted into the table per main-loop tick while loading.
+FIRST_BATCH_SIZE = 50
+BATCH_SIZE = 1000
+# Fully loaded tables up to this many rows are sorted in memory; larger ones in SQLite.
+IN_MEMORY_SORT_LIMIT = 200000
+# Pause in typing (ms) before the search box reloads the table.
+SEARCH_DELAY_MS = 250
+# Rows moved per mouse-wheel notch.
+WHEEL_ROWS = 3
 # ---------------------
 
 class CustomerViewerApp(tk.Tk):
     """
     A GUI application to view and sort data from a SQLite database.
+
+    Loaded rows are kept in a compact CustomerStore, and the Treeview only
+    ever holds the rows that fit on screen: scrolling redraws those few
+    items from the store instead of keeping a widget item for every row.
     """
     def __init__(self):
         super().__init__()
+        self.source = None # The table being shown (columns and row count)
+        self.sort_order = None # (column, descending) of the current sort, if any
+        self.loaded_rows = 0
+        self.rows = CustomerStore(()) # Loaded rows, in load order
+        self.order = array("l") # Positions in self.rows of the rows shown, in display order
+        self.stale = set() # Positions in self.rows of rows since deleted or replaced by a newer copy
+        self.change_seq = None # Latest change-log entry applied (None without a change log)
+        self.top = 0 # Display position of the first row on screen
+        self.selected = set() # Row positions of the selected rows, on screen or not
+        self.anchor = 0 # Display position a Shift-click or Shift+key range starts from
+        self.row_metrics = (25, 20) # Treeview heading and row height in pixels, measured once rows are shown
+        self.sort_keys = None # Cached sort keys for self.rows, built on the first in-memory sort
+        self.pending_batches = deque() # Streamed batches waiting to be inserted
+        self.insert_job, self.stream_finished = None, False
+        self.worker = DBWorker(self, DB_FILE) # Queries run here, off the Tk thread
+        self.export_worker = None # Exports, see export_data()
+        self.load_job = None
+        self.search_text, self.search_job = "", None
+        self.load_timer = lambda: None # Called when a load or SQL sort has shown every row
+        self.watcher = None # Notices changes made by other stations, once a table is shown
         self.title("Customer Database Viewer")
+        self.protocol("WM_DELETE_WINDOW", self.close)
         self.geometry("900x600") # Set a default window size
 
         # --- Main Frame ---
         main_frame = ttk.Frame(self, padding="10")
         main_frame.pack(fill=tk.BOTH, expand=True)
 
+        # --- Search Bar ---
+        search_frame = ttk.Frame(main_frame)
+        search_frame.pack(fill=tk.X, pady=(0, 10))
+        ttk.Label(search_frame, text="Search name, email or phone:").pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        ttk.Entry(search_frame, textvariable=self.search_var).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 0))
+        self.search_var.trace_add("write", self.schedule_search)
+
         # --- Treeview (Table Display) ---
         tree_frame = ttk.Frame(main_frame)
         tree_frame.pack(fill=tk.BOTH, expand=True)
         
         self.tree = ttk.Treeview(tree_frame, show="headings")
         
-        vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
+        # The vertical scrollbar moves through self.rows; the Treeview never scrolls itself.
+        self.vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.scroll_rows)
         hsb = ttk.Scrollbar(tree_frame, orient="horizontal", command=self.tree.xview)
-        self.tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        self.tree.configure(xscrollcommand=hsb.set)
+        self.tree.bind("<Configure>", lambda event: self.render_rows())
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self.handle_mouse_wheel)
+        for key in ("Up", "Down", "Prior", "Next", "Home", "End"):
+            self.tree.bind(f"<KeyPress-{key}>", self.handle_key_nav)
+            self.tree.bind(f"<Shift-KeyPress-{key}>", self.handle_key_nav)
+        self.tree.bind("<Button-1>", self.handle_click)
+        self.tree.bind("<Control-Button-1>", self.handle_click)
+        self.tree.bind("<Shift-Button-1>", self.handle_shift_click)
+        self.tree.bind("<<TreeviewSelect>>", self.remember_selection)
 
         self.tree.grid(row=0, column=0, sticky="nsew")
-        vsb.grid(row=0, column=1, sticky="ns")
+        self.vsb.grid(row=0, column=1, sticky="ns")
         hsb.grid(row=1, column=0, sticky="ew")
 
         tree_frame.grid_rowconfigure(0, weight=1)
@@ -45,85 +110,597 @@ class CustomerViewerApp(tk.Tk):
         controls_frame.pack(fill=tk.X, pady=(10, 0))
         
         refresh_button = ttk.Button(
-            controls_frame, text="Refresh Data", command=self.load_data
+            controls_frame, text="Refresh Data", command=self.refresh_data
         )
         refresh_button.pack(side=tk.RIGHT)
+        self.export_button = ttk.Button(
+            controls_frame, text="Export...", command=self.export_data
+        )
+        self.export_button.pack(side=tk.RIGHT, padx=(0, 5))
 
         self.status_label = ttk.Label(
             controls_frame, text="Loading data...", anchor="w"
         )
         self.status_label.pack(side=tk.LEFT)
+        self.timing_label = ttk.Label(controls_frame, anchor="w") # Latest timings, see profiling.py
+        self.timing_label.pack(side=tk.LEFT, padx=(10, 0))
+        self.profiler = profiling.Profiler(self, self.timing_label) # F12 shows the timings overlay
 
         # --- Initial Data Load ---
-        self.load_data()
+        # Waits until the window is on screen, so it appears straight away.
+        profiling.after_first_paint(self, self.load_data)
 
     def load_data(self):
         """
-        Clears the current table and reloads all data from the database.
+        Clears the current table and streams all rows in from the worker thread.
+        Pressing Refresh again cancels a load that is still running.
         """
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        self.stop_loading()
+        self.clear_rows()
+        self.source = None
         
         if not os.path.exists(DB_FILE):
             messagebox.showerror("Error", f"Database file not found: '{DB_FILE}'")
             self.status_label.config(text="Error: Database file not found.")
             return
 
-        conn = None
-        try:
-            conn = sqlite3.connect(DB_FILE)
-            cursor = conn.cursor()
+        search_text = self.search_text
+
+        def open_source():
+            where, params = None, ()
+            if search_text:
+                where, params = search_filter(search_text, use_fts=ensure_search_index(DB_FILE))
+            source = CustomerPageSource(DB_FILE, table=TABLE_NAME, columns=None, where=where, params=params)
+            # Read before the rows, so no change made while they stream in is missed
+            change_seq = last_change(DB_FILE) if TABLE_NAME == "Customer" and has_change_log(DB_FILE) else None
+            source.count()
+            return source, change_seq
+
+        self.status_label.config(text="Searching..." if search_text else "Loading data...")
+        self.load_timer = profiling.begin("load table")
+        self.load_job = self.worker.submit(open_source, on_done=lambda result: self.show_source(*result),
+                                           on_error=self.show_load_error, name="open table")
+
+    def refresh_data(self):
+        """
+        Brings the table up to date: with a change log, only the rows changed
+        since the last refresh are re-read; otherwise everything is reloaded.
+        """
+        if self.change_seq is not None and self.source is not None and self.stream_finished \
+                and not self.pending_batches:
+            self.catch_up()
+        else:
+            self.load_data()
+
+    def schedule_search(self, *args):
+        """
+        Reloads the table once typing in the search box pauses.
+        """
+        if self.search_job:
+            self.after_cancel(self.search_job)
+        self.search_job = self.after(SEARCH_DELAY_MS, self.run_search)
+
+    def run_search(self):
+        """
+        Shows only the rows whose name, email or phone number match the search box.
+        """
+        self.search_job = None
+        text = self.search_var.get().strip()
+        if text != self.search_text:
+            self.search_text = text
+            self.load_data()
+
+    @profiling.timed("clear rows")
+    def clear_rows(self):
+        """
+        Removes every row from the table and forgets the cached sort keys.
+        """
+        self.tree.delete(*self.tree.get_children())
+        self.rows, self.order, self.sort_keys = CustomerStore(()), array("l"), None
+        self.stale = set()
+        self.top, self.loaded_rows = 0, 0
+        self.selected.clear()
+        self.anchor = 0
+        self.vsb.set(0, 1)
+
+    def rows_in_view(self):
+        """
+        Returns how many rows fit in the Treeview, measuring the row height
+        from a row on screen when there is one.
+        """
+        items = self.tree.get_children()
+        box = self.tree.bbox(items[0]) if items else None
+        if box:
+            self.row_metrics = (box[1], box[3])
+        heading, row_height = self.row_metrics
+        return max(1, (self.tree.winfo_height() - heading) // row_height)
+
+    @profiling.timed("render rows")
+    def render_rows(self):
+        """
+        Redraws the rows on screen from self.rows, starting at display position
+        self.top, and moves the scrollbar to match.
+        """
+        count, visible = len(self.order), self.rows_in_view()
+        self.top = max(0, min(self.top, count - visible))
+        positions = self.order[self.top:self.top + visible]
+        self.tree.delete(*self.tree.get_children())
+        for position, row in zip(positions, self.rows.rows(positions)):
+            self.tree.insert("", "end", iid=position, values=row)
+        self.tree.selection_set([position for position in positions if position in self.selected])
+        if count:
+            self.vsb.set(self.top / count, min(1.0, (self.top + visible) / count))
+        else:
+            self.vsb.set(0, 1)
+
+    def scroll_rows(self, *args):
+        """
+        Handles the vertical scrollbar ("moveto fraction" or "scroll n units|pages").
+        """
+        count, visible = len(self.order), self.rows_in_view()
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * count)
+        elif args[0] == "scroll":
+            self.top += int(args[1]) * (visible if args[2] == "pages" else 1)
+        self.render_rows()
+
+    def handle_mouse_wheel(self, event):
+        """
+        Scrolls WHEEL_ROWS rows per wheel notch.
+        """
+        step = -WHEEL_ROWS if event.num == 4 or event.delta > 0 else WHEEL_ROWS
+        self.scroll_rows("scroll", step, "units")
+        return "break"
+
+    def handle_key_nav(self, event):
+        """
+        Moves the selection with the arrow, Page Up/Down, Home and End keys,
+        scrolling through every loaded row, not only the ones on screen.
+        With Shift held the selection is extended from the anchor instead.
+        """
+        count, visible = len(self.order), self.rows_in_view()
+        if not count:
+            return "break"
+        focus = self.tree.focus()
+        current = self.top + self.tree.index(focus) if focus else self.top
+        steps = {"Up": -1, "Down": 1, "Prior": -visible, "Next": visible, "Home": -count, "End": count}
+        target = max(0, min(count - 1, current + steps[event.keysym]))
+        if target < self.top:
+            self.top = target
+        elif target >= self.top + visible:
+            self.top = target - visible + 1
+        position = self.order[target]
+        if event.state & 0x0001:
+            self.selected = self.positions_between(self.anchor, target)
+        else:
+            self.selected, self.anchor = {position}, target
+        self.render_rows()
+        self.tree.focus(position)
+        return "break"
+
+    def handle_click(self, event):
+        """
+        Makes a plainly clicked or Ctrl-clicked row the anchor for Shift ranges.
+        A plain click also starts a new selection; the Treeview selects the row itself.
+        """
+        if not event.state & 0x0004:
+            self.selected.clear()
+        item = self.tree.identify_row(event.y)
+        if item:
+            self.anchor = self.top + self.tree.index(item)
+
+    def handle_shift_click(self, event):
+        """
+        Selects every row from the anchor to the clicked row, including rows
+        scrolled off screen in between.
+        """
+        item = self.tree.identify_row(event.y)
+        if not item:
+            return "break"
+        self.selected = self.positions_between(self.anchor, self.top + self.tree.index(item))
+        self.render_rows()
+        self.tree.focus(item)
+        return "break"
+
+    def positions_between(self, first, last):
+        """
+        Returns the row positions displayed from `first` to `last` (display positions, either way round).
+        """
+        low, high = sorted((first, last))
+        return set(self.order[low:high + 1])
+
+    def remember_selection(self, event):
+        """
+        Keeps self.selected in step with clicks on the rows on screen.
+        """
+        shown = {int(item) for item in self.tree.get_children()}
+        self.selected = (self.selected - shown) | {int(item) for item in self.tree.selection()}
+
+    def stop_loading(self):
+        """
+        Cancels any running load and drops the batches it has not inserted yet.
+        """
+        if self.load_job:
+            self.load_job.cancel()
+        if self.insert_job:
+            self.after_cancel(self.insert_job)
+        self.pending_batches.clear()
+        self.load_job, self.insert_job, self.stream_finished = None, None, False
+
+    def show_source(self, source, change_seq=None):
+        """
+        Sets up the columns for a freshly opened table and starts streaming its
+        rows. `change_seq` is the change log's latest entry when it was opened.
+        """
+        self.source, self.change_seq = source, change_seq
+        headers = source.columns
+        if self.watcher is None:
+            self.watcher = ChangeWatcher(self, DB_FILE, self.apply_outside_changes)
+
+        self.tree["columns"] = headers
+        
+        for col in headers:
+            self.tree.column(col, width=120, anchor="w")
+        if self.sort_order and self.sort_order[0] not in headers:
+            self.sort_order = None
+        self.update_headings()
 
-            cursor.execute(f"SELECT * FROM {TABLE_NAME}")
-            rows = cursor.fetchall()
-            
-            headers = [description[0] for description in cursor.description]
+        self.stream_rows()
 
-            self.tree["columns"] = headers
-            
-            for col in headers:
+    def update_headings(self):
+        """
+        Labels the sorted column with an arrow and points each header at its next sort.
+        """
+        for col in self.source.columns:
+            if self.sort_order and self.sort_order[0] == col:
+                reverse = self.sort_order[1]
+                text = f"{col} {'▼' if reverse else '▲'}"
+                self.tree.heading(col, text=text, command=lambda c=col, r=reverse: self.sort_column(c, not r))
+            else:
                 self.tree.heading(col, text=col, command=lambda c=col: self.sort_column(c, False))
-                self.tree.column(col, width=120, anchor="w")
 
-            for row in rows:
-                self.tree.insert("", "end", values=row)
+    def stream_rows(self):
+        """
+        Streams the table's rows in the current sort order from the worker thread.
+        The first small batch fills the screen straight away; the rest follow in
+        larger batches, one per main-loop tick, so the window stays interactive.
+        """
+        source = self.source
+        self.rows = CustomerStore(source.columns)
+        if self.sort_order:
+            col, reverse = self.sort_order
+            # Sorting still works without the index, only slower, so failures are ignored.
+            self.worker.submit(lambda: source.ensure_sort_index(col), on_error=lambda e: None, name="sort index")
+            sql = source.select_sql(col, reverse)
+        else:
+            sql = source.select_sql()
+        self.load_job = self.worker.stream(sql, source.params, on_chunk=self.queue_batch,
+                                           on_done=self.finish_load, on_error=self.show_load_error,
+                                           chunk_size=BATCH_SIZE, first_chunk_size=FIRST_BATCH_SIZE,
+                                           name="stream rows")
 
-            record_count = len(rows)
-            self.status_label.config(text=f"Found {record_count} records.")
+    def queue_batch(self, rows):
+        """
+        Buffers a batch delivered by the worker thread for insertion.
+        """
+        self.pending_batches.append(rows)
+        if self.insert_job is None:
+            self.insert_job = self.after_idle(self.insert_next_batch)
 
-        except sqlite3.OperationalError as e:
-            error_msg = f"Database Error: {e}\n\nHint: Is the table name '{TABLE_NAME}' correct?"
+    @profiling.timed("insert rows")
+    def insert_next_batch(self):
+        """
+        Adds one buffered batch to the loaded rows (drawing it if it lands on
+        screen), then yields to the main loop before the next one.
+        """
+        self.insert_job = None
+        rows = self.pending_batches.popleft()
+        shown_before = len(self.order)
+        self.order.extend(range(len(self.rows), len(self.rows) + len(rows)))
+        self.rows.extend(rows)
+        self.loaded_rows += len(rows)
+        if shown_before < self.top + self.rows_in_view():
+            self.render_rows() # Some of the new rows land on screen
+        else:
+            self.vsb.set(self.top / len(self.order), min(1.0, (self.top + self.rows_in_view()) / len(self.order)))
+
+        if self.pending_batches:
+            self.insert_job = self.after(1, self.insert_next_batch)
+        if self.stream_finished and not self.pending_batches:
+            self.show_loaded()
+        else:
+            self.status_label.config(text=f"Loading... {self.loaded_rows} of {self.source.count()} records.")
+
+    def finish_load(self, record_count):
+        """
+        Notes that the worker has read every row; the status updates once they are all shown.
+        """
+        self.stream_finished = True
+        if not self.pending_batches and self.insert_job is None:
+            self.show_loaded()
+
+    def show_loaded(self):
+        """
+        Reports a finished load, and how long it took if timing is on.
+        """
+        self.status_label.config(text=f"Found {self.loaded_rows} records.")
+        self.load_timer()
+        self.load_timer = lambda: None
+
+    def show_load_error(self, error):
+        """
+        Reports a failed load from the worker thread.
+        """
+        self.stop_loading()
+        self.source = None
+        if isinstance(error, sqlite3.OperationalError):
+            error_msg = f"Database Error: {error}\n\nHint: Is the table name '{TABLE_NAME}' correct?"
             messagebox.showerror("Database Error", error_msg)
             self.status_label.config(text="Error: Could not read table.")
-        except Exception as e:
-            messagebox.showerror("Error", f"An unexpected error occurred: {e}")
+        else:
+            messagebox.showerror("Error", f"An unexpected error occurred: {error}")
             self.status_label.config(text="An unexpected error occurred.")
-        finally:
-            if conn:
-                conn.close()
 
-    def sort_column(self, col, reverse):
+    def apply_outside_changes(self):
         """
-        Sorts the Treeview data when a column header is clicked.
+        Catches up with a commit made elsewhere without reloading the table.
+
+        With a change log (see changeLog.py), the customers changed since the
+        last change applied are re-read on the worker thread and patched in:
+        deleted ones are dropped, changed ones replaced and new ones added. If
+        the log has been compacted past that point, the table is reloaded.
+
+        Without one, rows added since the load (keys above the largest one
+        loaded) are appended; removed rows cannot be told apart that way, so
+        the status bar says how many there were.
         """
-        data = [(self.tree.set(item, col), item) for item in self.tree.get_children('')]
-        
-        # --- THIS IS THE CORRECTED SECTION ---
-        # The try-except block correctly handles sorting columns with numbers vs. text.
-        try:
-            # Attempt to sort the data as numbers (floats)
-            data.sort(key=lambda t: float(t[0]), reverse=reverse)
-        except ValueError:
-            # If conversion to float fails, it means the column contains text.
-            # Fall back to sorting as case-insensitive strings.
-            data.sort(key=lambda t: str(t[0]).lower(), reverse=reverse)
-
-        for index, (val, item) in enumerate(data):
-            self.tree.move(item, '', index)
-
-        # Update the column heading's command to sort in the opposite direction next time
-        self.tree.heading(col, command=lambda: self.sort_column(col, not reverse))
+        source = self.source
+        if source is None or not self.stream_finished or self.pending_batches:
+            return # A load is running; Refresh picks up anything it misses
+        if self.change_seq is not None:
+            self.catch_up()
+            return
+        last_key = max(self.rows.column(source.key), default=None)
 
+        def read_changes():
+            return source.read_count(), source.rows_after(last_key)
+
+        def changes_read(result):
+            count, new_rows = result
+            if source is not self.source or not self.stream_finished:
+                return # Reloaded meanwhile
+            removed = self.loaded_rows + len(new_rows) - count
+            source.invalidate(count)
+            if new_rows:
+                self.add_rows(new_rows)
+            self.render_rows()
+            message = f"Found {self.loaded_rows} records."
+            if removed > 0:
+                message += f" {removed} were removed elsewhere; press Refresh to drop them."
+            self.status_label.config(text=message)
+
+        self.worker.submit(read_changes, on_done=changes_read, on_error=lambda e: None, name="read changes")
+
+    def catch_up(self):
+        """
+        Applies the change log's entries since self.change_seq, reloading
+        instead if they are no longer all there.
+        """
+        source, seq = self.source, self.change_seq
+        finished = profiling.begin("catch up")
+
+        def read_changes():
+            latest, keys = changes_since(DB_FILE, seq)
+            if not keys:
+                return latest, keys, [], None
+            return latest, keys, source.rows_with_keys(keys), source.read_count()
+
+        def changes_read(result):
+            latest, keys, rows, count = result
+            if source is not self.source or self.change_seq != seq:
+                return # Reloaded, or caught up by an earlier call, meanwhile
+            if keys is None:
+                self.load_data() # Too far behind to catch up
+                return
+            self.change_seq = latest
+            if keys:
+                source.invalidate(count)
+                self.apply_changes(keys, rows)
+            finished()
+
+        def failed(error):
+            self.status_label.config(text=f"Could not read changes: {error}")
+
+        self.worker.submit(read_changes, on_done=changes_read, on_error=failed, name="read changes")
+
+    @profiling.timed("apply changes")
+    def apply_changes(self, keys, rows):
+        """
+        Patches the loaded rows: `keys` are the customers that changed and
+        `rows` their current rows (missing for those deleted or no longer
+        matching the search). Changed rows keep their place; new rows go in
+        key order when the table is in key order, otherwise at the end until
+        the next sort.
+        """
+        key_column = self.rows.positions[self.source.key]
+        current = {row[key_column]: row for row in rows}
+        located = self.locate_rows(keys)
+        self.sort_keys = None # Its cached orders describe the old rows; rebuilt on the next sort
+        # Bottom up, so deleting a row never moves one still to be patched.
+        for key, index in sorted(located.items(), key=lambda item: item[1], reverse=True):
+            old, row = self.order[index], current.get(key)
+            self.stale.add(old)
+            if row is None:
+                del self.order[index]
+                self.loaded_rows -= 1
+                self.selected.discard(old)
+            else:
+                self.rows.append(row)
+                self.order[index] = len(self.rows) - 1
+                if old in self.selected:
+                    self.selected.discard(old)
+                    self.selected.add(self.order[index])
+        added = [current[key] for key in keys if key not in located and key in current]
+        if added:
+            self.add_rows(added)
+        self.render_rows()
+        self.status_label.config(text=f"Found {self.loaded_rows} records.")
+
+    def add_rows(self, rows):
+        """
+        Adds rows that were not loaded before: in key order when the table is
+        shown that way, otherwise at the end (or by the in-memory sort, when
+        the table is sorted and small enough).
+        """
+        first_new = len(self.rows)
+        self.rows.extend(rows)
+        self.loaded_rows += len(rows)
+        self.sort_keys = None
+        new_positions = range(first_new, len(self.rows))
+        if self.in_key_order():
+            key_column = self.rows.positions[self.source.key]
+            for position in new_positions:
+                self.order.insert(self.display_index_of(self.rows[position][key_column]), position)
+        elif self.sort_order and self.loaded_rows <= IN_MEMORY_SORT_LIMIT:
+            self.order = self.sorted_order()
+        else:
+            self.order.extend(new_positions)
+
+    def in_key_order(self):
+        """Tells whether the rows are shown in ascending key order (unsorted, or sorted by the key)."""
+        return self.sort_order is None or self.sort_order == (self.source.key, False)
+
+    def display_index_of(self, key):
+        """
+        Returns where the row with `key` is (or would go) in self.order, by
+        binary search; only for rows shown in key order.
+        """
+        key_column = self.rows.positions[self.source.key]
+        low, high = 0, len(self.order)
+        while low < high:
+            middle = (low + high) // 2
+            if self.rows[self.order[middle]][key_column] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def locate_rows(self, keys):
+        """
+        Returns {key: display index} for the rows with these keys that are
+        shown. Rows in key order are found by binary search; sorted ones need
+        a pass over the loaded keys.
+        """
+        key_column = self.rows.positions[self.source.key]
+        found = {}
+        if self.in_key_order():
+            for key in keys:
+                index = self.display_index_of(key)
+                if index < len(self.order) and self.rows[self.order[index]][key_column] == key:
+                    found[key] = index
+            return found
+        wanted, positions = set(keys), {}
+        for position, key in enumerate(self.rows.column(self.source.key)):
+            if key in wanted and position not in self.stale:
+                positions[position] = key
+        for index, position in enumerate(self.order):
+            if position in positions:
+                found[positions[position]] = index
+        return found
+
+    def sorted_order(self):
+        """
+        Returns the display order for self.sort_order from the cached sort
+        keys (built first if need be), leaving out stale rows.
+        """
+        if self.sort_keys is None:
+            self.sort_keys = SortKeyCache(self.rows, self.source.column_types())
+        order = self.sort_keys.order(*self.sort_order)
+        stale = self.stale
+        return array("l", (position for position in order if position not in stale)) if stale else array("l", order)
+
+    def export_data(self):
+        """
+        Saves the rows currently shown (the search results, in the current sort
+        order) to a CSV, JSON-lines or columnar file, gzipped if the name ends in
+        .gz. The export streams from the database on a worker thread of its
+        own, so searching, sorting and catching up with changes carry on
+        meanwhile. An export still running when the window closes is finished
+        before the program exits.
+        """
+        if self.source is None:
+            return
+        path = filedialog.asksaveasfilename(
+            title="Export Data", defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON lines", "*.jsonl"), ("Columnar", "*.cols"),
+                       ("Gzipped", "*.gz"), ("All files", "*.*")])
+        if not path:
+            return
+        source = self.source
+        sql = source.select_sql(*self.sort_order) if self.sort_order else source.select_sql()
+
+        def report(count): # Runs on the export thread, so hand the update to the Tk thread
+            self.export_worker.post(lambda: self.status_label.config(text=f"Exporting... {count} of {source.count()} records."))
+
+        def exported(count):
+            self.export_button.config(state=tk.NORMAL)
+            self.status_label.config(text=f"Exported {count} records to {os.path.basename(path)}.")
+
+        def failed(error):
+            self.export_button.config(state=tk.NORMAL)
+            messagebox.showerror("Export Error", f"The export failed: {error}")
+            self.status_label.config(text="Export failed.")
+
+        self.export_button.config(state=tk.DISABLED)
+        self.status_label.config(text=f"Exporting to {os.path.basename(path)}...")
+        from customerExport import export_query # Imported on first use, so it does not slow start-up
+        if self.export_worker is None:
+            self.export_worker = DBWorker(self, DB_FILE, daemon=False) # Completes the file after the window closes
+        self.export_worker.submit(lambda: export_query(DB_FILE, path, sql, source.params, progress=report),
+                                  on_done=exported, on_error=failed, name="export")
+
+    def close(self):
+        """
+        Stops watching for changes, drops results still on their way to the
+        window, stops the worker (a running load ends at its next batch),
+        lets a running export finish in the background, writes any profile
+        still recording, then closes the window.
+        """
+        if self.watcher:
+            self.watcher.stop()
+        get_handoff(self).close()
+        self.worker.shutdown(cancel=True)
+        if self.export_worker:
+            self.export_worker.shutdown(wait=False) # Its file is complete before the program exits
+        self.profiler.shutdown()
+        self.destroy()
+
+    def sort_column(self, col, reverse):
+        """
+        Sorts the table when a column header is clicked.
+
+        Once a table of up to IN_MEMORY_SORT_LIMIT rows has fully loaded, it is
+        sorted in memory with cached, type-aware keys and reordered in one Tcl
+        call. Otherwise the sort runs in SQLite (ORDER BY the column, compared as
+        numbers or text according to the schema) and the rows are streamed back
+        in that order; an index on the column is created the first time it is
+        sorted, so later sorts are a plain index scan.
+        """
+        if self.source is None:
+            return
+        self.sort_order = (col, reverse)
+        self.update_headings()
+        if self.stream_finished and not self.pending_batches and self.loaded_rows <= IN_MEMORY_SORT_LIMIT:
+            with profiling.span("sort in memory"):
+                self.order = self.sorted_order()
+                self.anchor = 0 # Display positions have moved
+                self.render_rows()
+            return
+        self.stop_loading()
+        self.clear_rows()
+        self.load_timer = profiling.begin("sort in SQL")
+        self.status_label.config(text=f"Sorting by {col}...")
+        self.stream_rows()
 
 # This makes the script runnable
 if __name__ == "__main__":
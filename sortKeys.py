@@ -0,0 +1,102 @@
+import re
+from array import array
+from migrations import iso_birthday
+
+# --- Configuration ---
+# Text formats recognised as dates besides MM-DD-YYYY, which is read by
+# migrations.iso_birthday() like everywhere else. Each pattern captures year,
+# month and day by group name so values can be compared as ISO dates.
+DATE_PATTERNS = (
+    re.compile(r"^(?P<year>\d{4})-(?P<month>\d{1,2})-(?P<day>\d{1,2})$"), # YYYY-MM-DD (ISO)
+)
+# Declared SQLite types that give a column numeric affinity.
+NUMERIC_TYPES = ("INT", "REAL", "FLOA", "DOUB", "NUM", "DEC")
+# ---------------------
+
+# Keys are (rank, value) pairs so that one odd value never breaks a column:
+# empty values sort first, then values of the column's type, then anything else as text.
+_EMPTY, _TYPED, _OTHER = 0, 1, 2
+
+
+def _text_key(value):
+    return (_OTHER, str(value).casefold())
+
+def _number_key(value):
+    if isinstance(value, (int, float)):
+        return (_TYPED, value)
+    try:
+        return (_TYPED, float(value))
+    except (TypeError, ValueError):
+        return _text_key(value)
+
+def _date_key(value):
+    if isinstance(value, str):
+        iso = iso_birthday(value) # MM-DD-YYYY, months and days of one or two digits
+        if iso:
+            return (_TYPED, iso)
+        for pattern in DATE_PATTERNS:
+            match = pattern.match(value)
+            if match:
+                return (_TYPED, f"{match['year']}-{int(match['month']):02d}-{int(match['day']):02d}")
+    return _text_key(value)
+
+def _plain_text_key(value):
+    return (_TYPED, str(value).casefold())
+
+KEY_FUNCTIONS = {"number": _number_key, "date": _date_key, "text": _plain_text_key}
+
+
+def column_kind(declared_type, values):
+    """
+    Decides how a column should be compared: "number", "date" or "text".
+    Numeric declared types win outright; otherwise the kind most of the
+    non-empty values parse as is used.
+    """
+    if any(name in declared_type.upper() for name in NUMERIC_TYPES):
+        return "number"
+    filled = numbers = dates = 0
+    for value in values:
+        if value is None or value == "":
+            continue
+        filled += 1
+        if _date_key(value)[0] == _TYPED:
+            dates += 1
+        elif _number_key(value)[0] == _TYPED:
+            numbers += 1
+    if filled and dates * 2 > filled:
+        return "date"
+    if filled and numbers * 2 > filled:
+        return "number"
+    return "text"
+
+
+class SortKeyCache:
+    """
+    Typed sort keys for rows held in memory, computed once per column.
+
+    The first sort on a column works out the column's kind from its declared
+    type and its data, parses every value into a key and stores the ascending
+    order. Later sorts on that column, in either direction, reuse it.
+    """
+    def __init__(self, rows, column_types):
+        self.rows = rows
+        self.columns = list(column_types)
+        self.column_types = column_types
+        self._orders = {} # column -> row positions in ascending order
+
+    def order(self, column, descending=False):
+        """Returns the row positions sorted by `column`."""
+        ascending = self._orders.get(column)
+        if ascending is None:
+            ascending = self._orders[column] = self._sort(column)
+        return ascending[::-1] if descending else ascending
+
+    def _sort(self, column):
+        if hasattr(self.rows, "column"): # A CustomerStore hands over a whole column at once
+            values = self.rows.column(column)
+        else:
+            index = self.columns.index(column)
+            values = [row[index] for row in self.rows]
+        key_function = KEY_FUNCTIONS[column_kind(self.column_types[column], values)]
+        keys = [(_EMPTY, 0) if value is None or value == "" else key_function(value) for value in values]
+        return array("l", sorted(range(len(keys)), key=keys.__getitem__)) # 8 bytes a row, not a list of ints
@@ -0,0 +1,70 @@
+import queue
+import sys
+import threading
+import weakref
+
+# --- Configuration ---
+# How often (ms) the Tk thread collects the callbacks background threads handed over.
+HANDOFF_INTERVAL_MS = 10
+# ---------------------
+
+
+class TkHandoff:
+    """
+    Passes callbacks from background threads to the Tk thread.
+
+    Background threads never call into Tk themselves: with a threaded Tcl, a
+    Tcl call from another thread (root.after included) waits until the main
+    loop serves it, so a Tk thread that is itself waiting for that thread
+    (join() in a close method) would deadlock. Instead, post() puts the call
+    on a queue.Queue and the Tk thread runs whatever has arrived every
+    HANDOFF_INTERVAL_MS. After close(), posts are dropped, so threads can be
+    stopped and joined safely while the window goes.
+    """
+    def __init__(self, root, interval_ms=HANDOFF_INTERVAL_MS):
+        self.root = root
+        self.interval = interval_ms
+        self.calls = queue.Queue()
+        self.closed = False
+        self.poll_job = root.after(self.interval, self._drain)
+
+    def post(self, callback, *args):
+        """Runs `callback(*args)` on the Tk thread soon. Safe to call from any thread."""
+        if not self.closed:
+            self.calls.put((callback, args))
+
+    def _drain(self):
+        """Runs the calls handed over since the last poll (Tk thread)."""
+        while not self.closed:
+            try:
+                callback, args = self.calls.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args)
+            except Exception:
+                self.root.report_callback_exception(*sys.exc_info()) # As Tk reports an after() callback's error
+        if not self.closed:
+            self.poll_job = self.root.after(self.interval, self._drain)
+
+    def close(self):
+        """Stops running handed-over calls; any still queued, or posted later, are dropped (Tk thread)."""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.root.after_cancel(self.poll_job)
+        except Exception:
+            pass # The window has already been destroyed
+
+
+_handoffs = weakref.WeakKeyDictionary()
+_handoffs_lock = threading.Lock()
+
+def get_handoff(root):
+    """Returns the shared TkHandoff for a window, creating it on first use (Tk thread)."""
+    with _handoffs_lock:
+        handoff = _handoffs.get(root)
+        if handoff is None:
+            handoff = _handoffs[root] = TkHandoff(root)
+        return handoff
@@ -0,0 +1,154 @@
+import queue
+import sqlite3
+import threading
+import time
+import profiling
+from dbConnection import get_manager, retry_busy
+from tkHandoff import get_handoff
+
+# --- Configuration ---
+# How long (ms) the first write in a group waits for others to join it.
+GROUP_DELAY_MS = 20
+# Most writes committed in one transaction.
+MAX_GROUP_SIZE = 500
+# ---------------------
+
+_FLUSH = object() # Queued by flush(): commit what is waiting, then signal
+
+def _raise(error):
+    raise error
+
+
+class WriteQueue:
+    """
+    Write-behind queue for customer changes, with group commit.
+
+    Writes are queued and run on one background thread, which gathers every
+    write arriving within GROUP_DELAY_MS of the first (up to MAX_GROUP_SIZE)
+    and runs them in a single transaction, so a burst of clicks, or several
+    stations writing at once, costs one commit instead of one each. Each
+    write runs inside its own SAVEPOINT: one that fails is rolled back and
+    reported on its own while the rest of the group still commits.
+
+    Results are handed back like DBWorker's: `on_done` or `on_error` is
+    called on the Tk thread through the window's TkHandoff. The writer thread
+    never calls into Tk itself, so close() can wait for it from the Tk thread.
+    Without a root (in scripts), they are called on the writer thread.
+    close() commits anything still queued and checkpoints the WAL before the
+    program exits.
+    """
+    def __init__(self, root, db_file, delay_ms=GROUP_DELAY_MS, max_group=MAX_GROUP_SIZE):
+        self.root = root
+        self.handoff = get_handoff(root) if root is not None else None
+        self.db = get_manager(db_file)
+        self.delay = delay_ms / 1000
+        self.max_group = max_group
+        self.writes = queue.Queue()
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, work, on_done=None, on_error=None):
+        """
+        Queues `work(conn)`, a function that runs its statements on the
+        writer's connection. Its return value (e.g. a new row's id) is passed
+        to `on_done` once the group it ran in has committed; an exception it
+        raised, or a failed commit, goes to `on_error`.
+        """
+        if self.closed:
+            raise RuntimeError("the write queue is closed")
+        if on_error is None and self.root is not None:
+            on_error = _raise # Surfaces in Tk's error report, as with DBWorker
+        self.writes.put((work, on_done, on_error))
+
+    def execute(self, sql, params=(), on_done=None, on_error=None):
+        """Queues one statement; `on_done` receives its cursor's lastrowid."""
+        self.submit(lambda conn: conn.execute(sql, params).lastrowid, on_done, on_error)
+
+    def flush(self, timeout=None):
+        """Waits until every write queued so far has been committed (or has failed)."""
+        done = threading.Event()
+        self.writes.put((_FLUSH, done, None))
+        return done.wait(timeout)
+
+    def close(self):
+        """
+        Commits the writes still queued, makes them durable and stops the
+        writer thread. Safe on the Tk thread: the writer only queues results
+        for it, so waiting here cannot block the writer.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.writes.put(None)
+        self.thread.join()
+
+    def _run(self):
+        """Writer loop: gathers writes into groups and commits each group."""
+        while True:
+            item = self.writes.get()
+            if item is None:
+                break
+            group, stopping = [item], False
+            deadline = time.monotonic() + self.delay
+            while len(group) < self.max_group and group[-1][0] is not _FLUSH:
+                try:
+                    item = self.writes.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                group.append(item)
+            self._commit(group)
+            if stopping:
+                break
+        try:
+            # Copy the WAL into the database file and sync it, so nothing waits on a later checkpoint.
+            self.db.execute("PRAGMA wal_checkpoint(FULL)")
+        except sqlite3.Error:
+            pass
+
+    def _commit(self, group):
+        """Runs one group of writes in a single transaction and reports each write's outcome."""
+        flushes = [item[1] for item in group if item[0] is _FLUSH]
+        writes = [item for item in group if item[0] is not _FLUSH]
+        results = []
+        if writes:
+            conn = self.db.connection()
+
+            def run_group():
+                results.clear()
+                with profiling.span("write group"), conn:
+                    # Take the write lock up front (waiting for other stations, if need be),
+                    # rather than failing with "database is locked" halfway through the group.
+                    conn.execute("BEGIN IMMEDIATE")
+                    for work, on_done, on_error in writes:
+                        conn.execute("SAVEPOINT write")
+                        try:
+                            result = work(conn)
+                        except Exception as e:
+                            conn.execute("ROLLBACK TO write")
+                            results.append((on_error, e))
+                        else:
+                            results.append((on_done, result))
+                        conn.execute("RELEASE write")
+
+            try:
+                # If another station keeps the lock past the busy timeout, back off and run the group again
+                retry_busy(run_group)
+            except sqlite3.Error as e: # The commit itself failed, so none of the group was saved
+                results = [(on_error, e) for _, _, on_error in writes]
+        for callback, value in results:
+            self._post(callback, value)
+        for done in flushes:
+            done.set()
+
+    def _post(self, callback, value):
+        """Hands a result to the Tk thread (or calls it here, without a root)."""
+        if callback is None:
+            return
+        if self.handoff is None:
+            callback(value)
+            return
+        self.handoff.post(callback, value)